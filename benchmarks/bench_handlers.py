@@ -0,0 +1,399 @@
+"""
+Benchmark every Lambda handler in-process against moto's DynamoDB.
+
+Each handler is imported from lambda-functions/ (with the shared layer on
+the path) and invoked with a representative API Gateway event while the
+tables hold 1k, 10k and 100k seeded items. For every endpoint the run
+reports p50/p95/p99 latency, DynamoDB items read and calls per request,
+and peak Python memory.
+
+    pip install -e '.[bench]'
+    python benchmarks/bench_handlers.py --save benchmarks/baselines/moto.json
+    python benchmarks/bench_handlers.py --compare benchmarks/baselines/moto.json
+    python benchmarks/bench_handlers.py --items-snapshot --endpoints get-items
+
+moto is an in-memory stand-in, so absolute latencies are not what Lambda
+sees; compare runs from the same machine and watch items read, which is
+deterministic.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS_DIR = os.path.join(ROOT, 'lambda-functions')
+
+KB_TABLE = 'PersonalKnowledgeBase'
+BUDGET_TABLE = 'BudgetTracker'
+ACCOUNT_ID = 'bench'
+STATEMENT_BUCKET = 'bench-statements'
+STATEMENT_KEY = f"{ACCOUNT_ID}/statement.csv"
+STATEMENT_ROWS = 100
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Latency changes smaller than this are timer noise for millisecond handlers
+MIN_REGRESSION_MS = 5.0
+
+# Handlers read their configuration at import time
+os.environ.update({
+    'AWS_ACCESS_KEY_ID': 'bench',
+    'AWS_SECRET_ACCESS_KEY': 'bench',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'LOG_LEVEL': 'WARNING',
+})
+sys.path.insert(0, os.path.join(FUNCTIONS_DIR, 'shared'))
+
+
+def endpoint_events(size):
+    """Event factory per endpoint: index -> Lambda event."""
+    from change_tokens import issue_token
+
+    return {
+        'get-items': lambda i: {'httpMethod': 'GET', 'path': '/items'},
+        # A client that synced a minute ago: the seeded items are older
+        'get-changes': lambda i: {
+            'httpMethod': 'GET',
+            'path': '/items/changes',
+            'queryStringParameters': {'since': issue_token((datetime.utcnow() - timedelta(minutes=1)).isoformat())}
+        },
+        'create-item': lambda i: {
+            'httpMethod': 'POST',
+            'path': '/items',
+            'body': json.dumps({'title': f"Bench {i}", 'content': 'Created by the benchmark', 'tags': ['bench']})
+        },
+        # Every request deletes a different seeded item
+        'delete-item': lambda i: {
+            'httpMethod': 'DELETE',
+            'path': f"/items/item-{i}",
+            'pathParameters': {'id': f"item-{i}"}
+        },
+        'add-transaction': lambda i: {
+            'httpMethod': 'POST',
+            'headers': {'X-Account-Id': ACCOUNT_ID},
+            'body': json.dumps({
+                'id': f"bench-{size}-{i}",
+                'amount': 12.5,
+                'category': 'groceries',
+                'description': 'Benchmark expense',
+                'type': 'expense'
+            })
+        },
+        'get-balance': lambda i: {'httpMethod': 'GET', 'headers': {'X-Account-Id': ACCOUNT_ID}},
+        'send-alert': lambda i: {
+            'httpMethod': 'POST',
+            'body': json.dumps({'subject': 'Budget Alert', 'message': f"Benchmark alert {i}"})
+        },
+        # Re-imports the same statement: the first run writes, later runs dedupe
+        'import-transactions': lambda i: {'bucket': STATEMENT_BUCKET, 'key': STATEMENT_KEY},
+    }
+
+
+# endpoint -> (function directory, table it is configured with)
+ENDPOINTS = {
+    'get-items': ('knowledge-base/get-items', KB_TABLE),
+    'get-changes': ('knowledge-base/get-changes', KB_TABLE),
+    'create-item': ('knowledge-base/create-item', KB_TABLE),
+    'delete-item': ('knowledge-base/delete-item', KB_TABLE),
+    'add-transaction': ('budget-tracker/add-transaction', BUDGET_TABLE),
+    'get-balance': ('budget-tracker/get-balance', BUDGET_TABLE),
+    'send-alert': ('budget-tracker/send-alert', BUDGET_TABLE),
+    'import-transactions': ('budget-tracker/import-transactions', BUDGET_TABLE),
+}
+
+
+class DynamoDBCounter:
+    """Counts DynamoDB calls and items read through botocore's event hooks."""
+
+    def __init__(self):
+        self.calls = 0
+        self.items_read = 0
+
+    def __call__(self, parsed, **kwargs):
+        self.calls += 1
+        if 'ScannedCount' in parsed:
+            self.items_read += parsed['ScannedCount']
+        elif 'Responses' in parsed:
+            self.items_read += sum(len(items) for items in parsed['Responses'].values())
+        elif 'Item' in parsed:
+            self.items_read += 1
+
+    def reset(self):
+        self.calls = 0
+        self.items_read = 0
+
+
+def load_handler(name, function_dir, table_name):
+    """Import one lambda_function.py under a unique module name."""
+    os.environ['TABLE_NAME'] = table_name
+    path = os.path.join(FUNCTIONS_DIR, function_dir, 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location(f"bench_{name.replace('-', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+def create_tables(dynamodb):
+    """(Re)create both tables with the same keys and indexes as Terraform."""
+    for table in dynamodb.tables.all():
+        table.delete()
+    dynamodb.create_table(
+        TableName=KB_TABLE,
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'id', 'AttributeType': 'S'},
+            {'AttributeName': 'listing', 'AttributeType': 'S'},
+            {'AttributeName': 'updated_at', 'AttributeType': 'S'},
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'UpdatedAtIndex',
+            'KeySchema': [
+                {'AttributeName': 'listing', 'KeyType': 'HASH'},
+                {'AttributeName': 'updated_at', 'KeyType': 'RANGE'},
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    dynamodb.create_table(
+        TableName=BUDGET_TABLE,
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'id', 'AttributeType': 'S'},
+            {'AttributeName': 'account_id', 'AttributeType': 'S'},
+            {'AttributeName': 'timestamp', 'AttributeType': 'S'},
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'AccountIndex',
+            'KeySchema': [
+                {'AttributeName': 'account_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'timestamp', 'KeyType': 'RANGE'},
+            ],
+            'Projection': {'ProjectionType': 'ALL'},
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+
+def seed(dynamodb, size):
+    """Fill both tables with `size` items and the matching balance aggregate."""
+    started = datetime(2024, 1, 1)
+    with dynamodb.Table(KB_TABLE).batch_writer() as batch:
+        for i in range(size):
+            timestamp = (started + timedelta(minutes=i)).isoformat()
+            batch.put_item(Item={
+                'id': f"item-{i}",
+                'title': f"Note {i}",
+                'content': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4,
+                'type': 'note',
+                'tags': ['seed', f"group-{i % 10}"],
+                'created_at': timestamp,
+                'updated_at': timestamp,
+                'listing': 'items'
+            })
+
+    balance_minor = 0
+    with dynamodb.Table(BUDGET_TABLE).batch_writer() as batch:
+        for i in range(size):
+            income = i % 5 == 0
+            amount_minor = 250000 if income else 1000 + i % 9000
+            balance_minor += amount_minor if income else -amount_minor
+            batch.put_item(Item={
+                'id': f"seed-{i}",
+                'account_id': ACCOUNT_ID,
+                'amount_minor': amount_minor,
+                'currency': 'USD',
+                'category': 'salary' if income else f"category-{i % 12}",
+                'description': f"Seeded transaction {i}",
+                'type': 'income' if income else 'expense',
+                'timestamp': (started + timedelta(minutes=i)).isoformat()
+            })
+        batch.put_item(Item={
+            'id': f"balance#{ACCOUNT_ID}",
+            'balance_minor': balance_minor,
+            'txn_count': size
+        })
+
+
+def upload_statement(s3):
+    """Put a CSV statement in the bucket import-transactions reads from."""
+    s3.create_bucket(Bucket=STATEMENT_BUCKET)
+    lines = ['date,description,amount,category']
+    for i in range(STATEMENT_ROWS):
+        lines.append(f"2024-02-{i % 28 + 1:02d},Statement row {i},-{i % 90 + 10}.25,statement")
+    s3.put_object(Bucket=STATEMENT_BUCKET, Key=STATEMENT_KEY, Body='\n'.join(lines).encode('utf-8'))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def forget_moto_instances():
+    """Drop moto's record of every model instance it created.
+
+    moto keeps each instance for its server dashboard - including the copy of
+    every item a Scan returns - so 100k-item scans would exhaust memory
+    within a few requests. The tables themselves are untouched.
+    """
+    from moto.core.model_instances import reset_model_data
+
+    reset_model_data()
+
+
+def run_endpoint(handler, make_event, counter, iterations, memory_iterations, offset):
+    """Time `iterations` calls, then measure peak memory over a few more."""
+    latencies = []
+    errors = 0
+    counter.reset()
+    for i in range(iterations):
+        event = make_event(offset + i)
+        started = time.perf_counter()
+        response = handler(event, None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        forget_moto_instances()
+        if response.get('statusCode', 200) >= 400:
+            errors += 1
+    calls, items_read = counter.calls, counter.items_read
+
+    # tracemalloc slows every allocation, so memory gets its own pass
+    peak = 0
+    tracemalloc.start()
+    for i in range(memory_iterations):
+        event = make_event(offset + iterations + i)
+        tracemalloc.reset_peak()
+        handler(event, None)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        forget_moto_instances()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'items_read': round(items_read / iterations, 1),
+        'dynamodb_calls': round(calls / iterations, 1),
+        'peak_kib': round(peak / 1024, 1),
+        'errors': errors
+    }
+
+
+def run(sizes, endpoints, iterations, memory_iterations, items_snapshot=False):
+    # Imported here so --help works without the bench extras installed
+    import boto3
+    from moto import mock_aws
+
+    results = {}
+    if items_snapshot:
+        # get-items starts from a snapshot on the local filesystem
+        os.environ['ITEMS_SNAPSHOT_URL'] = f"file://{tempfile.mkdtemp(prefix='bench-')}/items.json.gz"
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb')
+        upload_statement(boto3.client('s3'))
+        os.environ['SNS_TOPIC_ARN'] = boto3.client('sns').create_topic(Name='bench-alerts')['TopicArn']
+        create_tables(dynamodb)
+
+        handlers = {name: load_handler(name, *ENDPOINTS[name]) for name in endpoints}
+        if items_snapshot:
+            snapshot_job = load_handler('snapshot-items', 'knowledge-base/snapshot-items', KB_TABLE)
+
+        from aws_clients import get_resource
+        counter = DynamoDBCounter()
+        get_resource('dynamodb').meta.client.meta.events.register('after-call.dynamodb', counter)
+
+        for size in sizes:
+            create_tables(dynamodb)
+            started = time.perf_counter()
+            seed(dynamodb, size)
+            print(f"\n📦 {size} items seeded in {time.perf_counter() - started:.1f}s")
+            if items_snapshot:
+                snapshot = snapshot_job({}, None)
+                print(f"📸 Snapshot of {snapshot['count']} items, {snapshot['bytes']} bytes")
+                if 'get-items' in handlers:
+                    # Make the next request load it rather than the previous size's
+                    handlers['get-items'].__globals__['snapshot_state']['loaded_at'] = None
+            print(f"  {'endpoint':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'read/req':>9} {'calls':>6} {'peak KiB':>9} {'errors':>6}")
+
+            events = endpoint_events(size)
+            results[str(size)] = {}
+            for name in endpoints:
+                stats = run_endpoint(handlers[name], events[name], counter, iterations, memory_iterations, offset=0)
+                results[str(size)][name] = stats
+                print(
+                    f"  {name:<20} {stats['p50_ms']:>7.2f}ms {stats['p95_ms']:>7.2f}ms {stats['p99_ms']:>7.2f}ms "
+                    f"{stats['items_read']:>9} {stats['dynamodb_calls']:>6} {stats['peak_kib']:>9} {stats['errors']:>6}"
+                )
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return regressions against a saved baseline: slower p95 or more items read."""
+    regressions = []
+    for size, endpoints in results.items():
+        for name, stats in endpoints.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not before:
+                continue
+            slower = stats['p95_ms'] - before['p95_ms']
+            if stats['p95_ms'] > before['p95_ms'] * threshold and slower > MIN_REGRESSION_MS:
+                regressions.append(f"{name} @ {size}: p95 {before['p95_ms']}ms -> {stats['p95_ms']}ms")
+            if stats['items_read'] > before['items_read']:
+                regressions.append(f"{name} @ {size}: items read {before['items_read']} -> {stats['items_read']}")
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the Lambda handlers against moto DynamoDB.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='seeded item counts (default: 1000 10000 100000)')
+    parser.add_argument('--endpoints', nargs='+', choices=list(ENDPOINTS), default=list(ENDPOINTS),
+                        help='endpoints to run (default: all)')
+    parser.add_argument('--iterations', type=int, default=50, help='timed requests per endpoint and size')
+    parser.add_argument('--memory-iterations', type=int, default=5, help='requests traced for peak memory')
+    parser.add_argument('--items-snapshot', action='store_true',
+                        help='serve get-items from a snapshot plus delta instead of a Scan')
+    parser.add_argument('--save', metavar='FILE', help='write the results as a baseline JSON file')
+    parser.add_argument('--compare', metavar='FILE', help='fail if results regress against a baseline')
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help='allowed p95 ratio over the baseline before failing (default: 1.5)')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.endpoints, args.iterations, args.memory_iterations, args.items_snapshot)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as baseline_file:
+            json.dump({
+                'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'iterations': args.iterations,
+                'results': results
+            }, baseline_file, indent=2)
+            baseline_file.write('\n')
+        print(f"\n💾 Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        if regressions:
+            print('\n❌ Regressions against the baseline:')
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print('\n✅ No regressions against the baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
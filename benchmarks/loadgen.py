@@ -0,0 +1,311 @@
+"""
+Open-loop load generator for the knowledge-base and budget tracker APIs.
+
+Replays a weighted mix of GET /items, POST /items, DELETE /items/{id},
+POST /transactions and GET /balance at a fixed request rate and records
+per-operation HDR latency histograms and error breakdowns.
+
+    pip install -e '.[bench]'
+
+    # API Gateway (terraform output api_gateway_url / budget tracker stage URL)
+    python benchmarks/loadgen.py --target api --rps 20 --duration 60 \\
+        --api-url https://abc.execute-api.us-east-1.amazonaws.com/prod \\
+        --budget-url https://def.execute-api.us-east-1.amazonaws.com/prod
+
+    # docker-compose stack (Lambda runtime interface emulator on 9001-9003)
+    python benchmarks/loadgen.py --target compose --rps 50 --duration 30
+
+    # kubernetes services (in-cluster DNS, or override with --url)
+    python benchmarks/loadgen.py --target k8s --rps 50
+
+Requests are scheduled on a fixed timetable whatever the server does, and
+latency is measured from the scheduled start, so a saturated target shows
+up as growing latency instead of a silently lower request rate.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+from hdrh.histogram import HdrHistogram
+
+# Lambda runtime interface emulator endpoint used by the container images
+INVOKE_PATH = '/2015-03-31/functions/function/invocations'
+
+# operation -> (method, path template, API the operation lives on)
+OPERATIONS = {
+    'get-items': ('GET', '/items', 'api'),
+    'create-item': ('POST', '/items', 'api'),
+    'delete-item': ('DELETE', '/items/{id}', 'api'),
+    'add-transaction': ('POST', '/transactions', 'budget'),
+    'get-balance': ('GET', '/balance', 'budget'),
+}
+
+DEFAULT_MIX = 'get-items=50,create-item=20,delete-item=10,add-transaction=10,get-balance=10'
+
+# Per-target invoke URLs for the emulator-based deployments
+COMPOSE_URLS = {
+    'get-items': f"http://localhost:9001{INVOKE_PATH}",
+    'create-item': f"http://localhost:9002{INVOKE_PATH}",
+    'delete-item': f"http://localhost:9003{INVOKE_PATH}",
+}
+K8S_URLS = {
+    'get-items': f"http://get-items-service{INVOKE_PATH}",
+    'create-item': f"http://create-item-service{INVOKE_PATH}",
+    'delete-item': f"http://delete-item-service{INVOKE_PATH}",
+}
+
+# Histograms track 1 us .. 60 s with 3 significant digits
+HISTOGRAM_MAX_US = 60 * 1000 * 1000
+
+
+def parse_mix(mix):
+    """'get-items=50,create-item=20' -> {'get-items': 50, 'create-item': 20}."""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation in mix: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def parse_urls(pairs):
+    """['get-items=http://...'] -> {'get-items': 'http://...'}."""
+    urls = {}
+    for pair in pairs or []:
+        name, _, url = pair.partition('=')
+        if name not in OPERATIONS or not url:
+            raise ValueError(f"Expected <operation>=<url>, got: {pair}")
+        urls[name] = url
+    return urls
+
+
+class Target:
+    """Turns an operation into an HTTP request for one deployment style."""
+
+    def __init__(self, kind, api_url=None, budget_url=None, urls=None, account_id='loadtest'):
+        self.kind = kind
+        self.account_id = account_id
+        self.bases = {'api': (api_url or '').rstrip('/'), 'budget': (budget_url or '').rstrip('/')}
+        defaults = {'compose': COMPOSE_URLS, 'k8s': K8S_URLS}.get(kind, {})
+        self.invoke_urls = {**defaults, **(urls or {})}
+
+    def supports(self, operation):
+        if self.kind == 'api':
+            return bool(self.bases[OPERATIONS[operation][2]])
+        return operation in self.invoke_urls
+
+    def request(self, operation, body=None, item_id=None):
+        """Return (method, url, headers, payload) for one call."""
+        method, template, api = OPERATIONS[operation]
+        path = template.format(id=item_id)
+        headers = {'Content-Type': 'application/json', 'X-Account-Id': self.account_id}
+        if self.kind == 'api':
+            return method, self.bases[api] + path, headers, body
+
+        # The emulator takes the API Gateway proxy event as the POST body
+        event = {
+            'httpMethod': method,
+            'path': path,
+            'headers': headers,
+            'pathParameters': {'id': item_id} if item_id else None,
+            'body': body
+        }
+        return 'POST', self.invoke_urls[operation], {'Content-Type': 'application/json'}, json.dumps(event)
+
+
+class Recorder:
+    """HDR histograms and error counts per operation."""
+
+    def __init__(self, operations):
+        self.histograms = {name: HdrHistogram(1, HISTOGRAM_MAX_US, 3) for name in operations}
+        self.total = HdrHistogram(1, HISTOGRAM_MAX_US, 3)
+        self.errors = Counter()
+        self.skipped = Counter()
+
+    def record(self, operation, latency_us):
+        latency_us = max(1, min(int(latency_us), HISTOGRAM_MAX_US))
+        self.histograms[operation].record_value(latency_us)
+        self.total.record_value(latency_us)
+
+    def error(self, operation, reason):
+        self.errors[(operation, reason)] += 1
+
+
+def response_status(target, status, text):
+    """HTTP status, or the Lambda response statusCode behind the emulator."""
+    if target.kind == 'api' or status != 200:
+        return status
+    try:
+        return int(json.loads(text).get('statusCode', 200))
+    except (ValueError, AttributeError):
+        return 502
+
+
+async def call(session, target, recorder, operation, scheduled, created_ids, rng, timeout):
+    body = None
+    item_id = None
+    if operation == 'create-item':
+        body = json.dumps({'title': f"Load test {rng.random():.6f}", 'content': 'Created by loadgen', 'type': 'note'})
+    elif operation == 'add-transaction':
+        body = json.dumps({
+            'amount': round(rng.uniform(1, 100), 2),
+            'category': rng.choice(['groceries', 'transport', 'utilities', 'other']),
+            'description': 'Load test',
+            'type': 'expense' if rng.random() < 0.8 else 'income'
+        })
+    elif operation == 'delete-item':
+        if not created_ids:
+            # Only items this run created are deleted
+            recorder.skipped[operation] += 1
+            return
+        item_id = created_ids.pop()
+
+    method, url, headers, payload = target.request(operation, body, item_id)
+    try:
+        async with session.request(method, url, headers=headers, data=payload,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            text = await response.text()
+            status = response_status(target, response.status, text)
+    except asyncio.TimeoutError:
+        status, text = 'timeout', ''
+    except aiohttp.ClientError as e:
+        status, text = type(e).__name__, ''
+
+    # Latency counts from the scheduled start (corrects coordinated omission)
+    recorder.record(operation, (time.perf_counter() - scheduled) * 1e6)
+    if not isinstance(status, int) or status >= 400:
+        recorder.error(operation, str(status))
+        return
+    if operation == 'create-item':
+        try:
+            result = json.loads(text)
+            created = result.get('item') or json.loads(result.get('body', '{}')).get('item')
+            created_ids.append(created['id'])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            pass
+
+
+async def run(target, weights, rps, duration, connections, timeout, seed):
+    operations = [name for name in weights if target.supports(name)]
+    for name in weights:
+        if name not in operations:
+            print(f"⚠️  {name} is not available on the {target.kind} target - skipped")
+    if not operations:
+        raise ValueError('No operation of the mix is available on this target')
+
+    rng = random.Random(seed)
+    recorder = Recorder(operations)
+    created_ids = []
+    tasks = []
+    total_requests = int(rps * duration)
+
+    # One pooled session; `connections` caps concurrent sockets
+    connector = aiohttp.TCPConnector(limit=connections, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        for i in range(total_requests):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            operation = rng.choices(operations, weights=[weights[name] for name in operations])[0]
+            tasks.append(asyncio.ensure_future(
+                call(session, target, recorder, operation, scheduled, created_ids, rng, timeout)
+            ))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    return recorder, elapsed
+
+
+def report(recorder, elapsed, hdr_dir=None):
+    """Print latency percentiles and errors; optionally write .hgrm files."""
+    print(f"\n  {'operation':<16} {'count':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'p99.9':>9} {'max':>9} {'errors':>7}")
+    rows = list(recorder.histograms.items()) + [('total', recorder.total)]
+    summary = {}
+    for name, histogram in rows:
+        count = histogram.get_total_count()
+        errors = sum(
+            n for (operation, _), n in recorder.errors.items()
+            if name == 'total' or name == operation
+        )
+        if not count:
+            continue
+        percentiles = {
+            f"p{pct:g}": histogram.get_value_at_percentile(pct) / 1000
+            for pct in (50, 90, 99, 99.9)
+        }
+        percentiles['max'] = histogram.get_max_value() / 1000
+        summary[name] = {'count': count, 'errors': errors, **{k: round(v, 2) for k, v in percentiles.items()}}
+        print(
+            f"  {name:<16} {count:>7} {percentiles['p50']:>7.1f}ms {percentiles['p90']:>7.1f}ms "
+            f"{percentiles['p99']:>7.1f}ms {percentiles['p99.9']:>7.1f}ms {percentiles['max']:>7.1f}ms {errors:>7}"
+        )
+
+    completed = recorder.total.get_total_count()
+    print(f"\n  {completed} requests in {elapsed:.1f}s ({completed / elapsed:.1f} req/s achieved)")
+    if recorder.errors:
+        print('\n  Errors:')
+        for (operation, reason), count in recorder.errors.most_common():
+            print(f"    {operation:<16} {reason:<24} {count}")
+    for operation, count in recorder.skipped.items():
+        print(f"  {operation}: {count} skipped (no created item to delete yet)")
+
+    if hdr_dir:
+        os.makedirs(hdr_dir, exist_ok=True)
+        for name, histogram in rows:
+            if histogram.get_total_count():
+                with open(os.path.join(hdr_dir, f"{name}.hgrm"), 'wb') as hgrm:
+                    # Values are recorded in microseconds; write milliseconds
+                    histogram.output_percentile_distribution(hgrm, 1000.0)
+        print(f"\n💾 HDR histograms written to {hdr_dir}/")
+
+    summary['errors'] = {f"{operation} {reason}": count for (operation, reason), count in recorder.errors.items()}
+    summary['elapsed_seconds'] = round(elapsed, 2)
+    return summary
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Open-loop load generator for the serverless APIs.')
+    parser.add_argument('--target', choices=['api', 'compose', 'k8s'], default='compose')
+    parser.add_argument('--api-url', help='knowledge-base API Gateway stage URL (target api)')
+    parser.add_argument('--budget-url', help='budget tracker API Gateway stage URL (target api)')
+    parser.add_argument('--url', action='append', metavar='OPERATION=URL',
+                        help='invoke URL for one operation (compose/k8s), e.g. add-transaction=http://localhost:9004'
+                             + INVOKE_PATH)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument('--rps', type=float, default=10, help='target requests per second')
+    parser.add_argument('--duration', type=float, default=30, help='test length in seconds')
+    parser.add_argument('--connections', type=int, default=50, help='maximum concurrent connections')
+    parser.add_argument('--timeout', type=float, default=10, help='per-request timeout in seconds')
+    parser.add_argument('--account', default='loadtest', help='X-Account-Id for budget tracker calls')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the request mix')
+    parser.add_argument('--hdr-out', metavar='DIR', help='write one .hgrm percentile file per operation')
+    parser.add_argument('--json', metavar='FILE', help='write the summary as JSON')
+    args = parser.parse_args(argv)
+
+    target = Target(args.target, args.api_url, args.budget_url, parse_urls(args.url), args.account)
+    weights = parse_mix(args.mix)
+    print(f"🚀 {args.rps:g} req/s for {args.duration:g}s against {args.target} ({args.mix})")
+
+    recorder, elapsed = asyncio.run(run(
+        target, weights, args.rps, args.duration, args.connections, args.timeout, args.seed
+    ))
+    summary = report(recorder, elapsed, args.hdr_out)
+
+    if args.json:
+        with open(args.json, 'w') as summary_file:
+            json.dump(summary, summary_file, indent=2)
+            summary_file.write('\n')
+    return 1 if recorder.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -20,6 +20,19 @@ resource "aws_dynamodb_table" "budget_tracker" {
     projection_type = "ALL"
   }
 
+  attribute {
+    name = "account_id"
+    type = "S"
+  }
+
+  # Per-account feed: balances and recent transactions are read with Query
+  global_secondary_index {
+    name            = "AccountIndex"
+    hash_key        = "account_id"
+    range_key       = "timestamp"
+    projection_type = "ALL"
+  }
+
   tags = {
     Name        = "Budget Tracker"
     Environment = var.environment
@@ -64,7 +77,9 @@ resource "aws_iam_role_policy" "budget_tracker_lambda" {
           "dynamodb:Scan",
           "dynamodb:Query",
           "dynamodb:UpdateItem",
-          "dynamodb:DeleteItem"
+          "dynamodb:DeleteItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:BatchWriteItem"
         ]
         Resource = [
           aws_dynamodb_table.budget_tracker.arn,
@@ -79,6 +94,20 @@ resource "aws_iam_role_policy" "budget_tracker_lambda" {
         ]
         Resource = aws_sns_topic.budget_alerts.arn
       },
+      {
+        Effect = "Allow"
+        Action = [
+          "lambda:InvokeFunction"
+        ]
+        Resource = aws_lambda_function.send_alert.arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject"
+        ]
+        Resource = "${aws_s3_bucket.budget_statements.arn}/*"
+      },
       {
         Effect = "Allow"
         Action = [
@@ -133,17 +162,51 @@ resource "aws_lambda_function" "add_transaction" {
   role          = aws_iam_role.budget_tracker_lambda.arn
   handler       = "lambda_function.handler"
   runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
   memory_size   = 128
   timeout       = 10
 
   environment {
     variables = {
-      TABLE_NAME    = aws_dynamodb_table.budget_tracker.name
-      SNS_TOPIC_ARN = aws_sns_topic.budget_alerts.arn
+      TABLE_NAME            = aws_dynamodb_table.budget_tracker.name
+      AWS_READ_TIMEOUT      = "2"
+      AWS_MAX_ATTEMPTS      = "3"
+      ALERT_FUNCTION_NAME   = aws_lambda_function.send_alert.function_name
+      LOW_BALANCE_THRESHOLD = var.low_balance_threshold
+      CATEGORY_BUDGETS      = jsonencode(var.category_budgets)
     }
   }
 }
 
+# Lambda Function: Send Alert (invoked asynchronously by add-transaction)
+resource "aws_lambda_function" "send_alert" {
+  filename      = "${path.module}/../lambda-functions/budget-tracker/send-alert/function.zip"
+  function_name = "budget-tracker-send-alert"
+  role          = aws_iam_role.budget_tracker_lambda.arn
+  handler       = "lambda_function.handler"
+  runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
+  memory_size   = 128
+  timeout       = 10
+
+  environment {
+    variables = {
+      TABLE_NAME             = aws_dynamodb_table.budget_tracker.name
+      AWS_READ_TIMEOUT       = "2"
+      AWS_MAX_ATTEMPTS       = "3"
+      SNS_TOPIC_ARN          = aws_sns_topic.budget_alerts.arn
+      ALERT_COOLDOWN_SECONDS = var.alert_cooldown_seconds
+    }
+  }
+}
+
+# Alerts are best-effort: retry briefly, then drop stale events
+resource "aws_lambda_function_event_invoke_config" "send_alert" {
+  function_name                = aws_lambda_function.send_alert.function_name
+  maximum_retry_attempts       = 2
+  maximum_event_age_in_seconds = 3600
+}
+
 # Lambda Function: Get Balance
 resource "aws_lambda_function" "get_balance" {
   filename      = "${path.module}/../lambda-functions/budget-tracker/get-balance/function.zip"
@@ -151,16 +214,73 @@ resource "aws_lambda_function" "get_balance" {
   role          = aws_iam_role.budget_tracker_lambda.arn
   handler       = "lambda_function.handler"
   runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
   memory_size   = 128
   timeout       = 10
 
   environment {
     variables = {
-      TABLE_NAME = aws_dynamodb_table.budget_tracker.name
+      TABLE_NAME       = aws_dynamodb_table.budget_tracker.name
+      AWS_READ_TIMEOUT = "2"
+      AWS_MAX_ATTEMPTS = "3"
+    }
+  }
+}
+
+# Lambda Function: Import Transactions (bank statement bulk import)
+resource "aws_lambda_function" "import_transactions" {
+  filename      = "${path.module}/../lambda-functions/budget-tracker/import-transactions/function.zip"
+  function_name = "budget-tracker-import-transactions"
+  role          = aws_iam_role.budget_tracker_lambda.arn
+  handler       = "lambda_function.handler"
+  runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
+  memory_size   = 128
+  timeout       = 120
+
+  environment {
+    variables = {
+      TABLE_NAME       = aws_dynamodb_table.budget_tracker.name
+      AWS_READ_TIMEOUT = "5"
+      AWS_MAX_ATTEMPTS = "3"
     }
   }
 }
 
+# S3 Bucket for uploaded bank statements (CSV/OFX)
+resource "aws_s3_bucket" "budget_statements" {
+  bucket = "budget-statements-${var.project_name}"
+
+  tags = {
+    Name        = "Budget Tracker Statements"
+    Environment = var.environment
+  }
+
+  lifecycle {
+    ignore_changes = [bucket]
+  }
+}
+
+resource "aws_lambda_permission" "s3_import_transactions" {
+  statement_id  = "AllowExecutionFromS3"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.import_transactions.function_name
+  principal     = "s3.amazonaws.com"
+  source_arn    = aws_s3_bucket.budget_statements.arn
+}
+
+# Import every uploaded statement
+resource "aws_s3_bucket_notification" "budget_statements" {
+  bucket = aws_s3_bucket.budget_statements.id
+
+  lambda_function {
+    lambda_function_arn = aws_lambda_function.import_transactions.arn
+    events              = ["s3:ObjectCreated:*"]
+  }
+
+  depends_on = [aws_lambda_permission.s3_import_transactions]
+}
+
 # API Gateway for Budget Tracker
 resource "aws_api_gateway_rest_api" "budget_tracker_api" {
   name        = "budget-tracker-api"
@@ -290,7 +410,7 @@ resource "aws_api_gateway_integration_response" "options_transactions" {
   response_parameters = {
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
     "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,X-Account-Id'"
   }
 
   depends_on = [
@@ -339,7 +459,7 @@ resource "aws_api_gateway_integration_response" "options_balance" {
   response_parameters = {
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
     "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,X-Account-Id'"
   }
 
   depends_on = [
@@ -425,6 +545,11 @@ output "budget_alerts_topic_arn" {
   value = aws_sns_topic.budget_alerts.arn
 }
 
+output "budget_statements_bucket" {
+  description = "Upload CSV/OFX bank statements here to bulk-import transactions"
+  value       = aws_s3_bucket.budget_statements.bucket
+}
+
 output "budget_tracker_api_url" {
   description = "The Budget Tracker API URL"
   value       = "${aws_api_gateway_stage.budget_tracker_prod.invoke_url}/transactions"
@@ -31,6 +31,33 @@ resource "aws_dynamodb_table" "knowledge_base" {
     type = "S"
   }
 
+  attribute {
+    name = "listing"
+    type = "S"
+  }
+
+  attribute {
+    name = "updated_at"
+    type = "S"
+  }
+
+  # Items and deletion tombstones by write time: get-items reads the changes
+  # since its snapshot with Query. Every write shares the partition key
+  # listing = "items", so writes are capped at about 1,000 WCU per second
+  # (docs/serverless/SNAPSHOTS.md)
+  global_secondary_index {
+    name            = "UpdatedAtIndex"
+    hash_key        = "listing"
+    range_key       = "updated_at"
+    projection_type = "ALL"
+  }
+
+  # Tombstones expire (delete-item sets expires_at)
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   tags = {
     Name        = "Personal Knowledge Base"
     Environment = var.environment
@@ -87,7 +114,18 @@ resource "aws_iam_role_policy" "lambda_dynamodb" {
           "dynamodb:Query",
           "dynamodb:UpdateItem"
         ]
-        Resource = aws_dynamodb_table.knowledge_base.arn
+        Resource = [
+          aws_dynamodb_table.knowledge_base.arn,
+          "${aws_dynamodb_table.knowledge_base.arn}/index/*"
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject"
+        ]
+        Resource = "${aws_s3_bucket.knowledge_base_snapshots.arn}/*"
       },
       {
         Effect = "Allow"
@@ -109,6 +147,14 @@ resource "aws_iam_role_policy" "lambda_dynamodb" {
   })
 }
 
+# Lambda Layer: handler code shared by every function (responses, clients, logging)
+resource "aws_lambda_layer_version" "shared" {
+  filename            = "${path.module}/../lambda-functions/shared/layer.zip"
+  layer_name          = "pkb-shared"
+  source_code_hash    = filebase64sha256("${path.module}/../lambda-functions/shared/layer.zip")
+  compatible_runtimes = ["python3.9"]
+}
+
 # Lambda Function: Get Items
 resource "aws_lambda_function" "get_items" {
   filename      = "${path.module}/../lambda-functions/knowledge-base/get-items/function.zip"
@@ -116,6 +162,26 @@ resource "aws_lambda_function" "get_items" {
   role          = aws_iam_role.lambda_role.arn
   handler       = "lambda_function.handler"
   runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
+  memory_size   = 128 # Free Tier: 512MB free per month
+  timeout       = 3   # Free Tier: 1M requests/month free
+
+  environment {
+    variables = {
+      TABLE_NAME         = aws_dynamodb_table.knowledge_base.name
+      ITEMS_SNAPSHOT_URL = local.items_snapshot_url
+    }
+  }
+}
+
+# Lambda Function: Get Changes (incremental sync of the listing)
+resource "aws_lambda_function" "get_changes" {
+  filename      = "${path.module}/../lambda-functions/knowledge-base/get-changes/function.zip"
+  function_name = "pkb-api-get-changes"
+  role          = aws_iam_role.lambda_role.arn
+  handler       = "lambda_function.handler"
+  runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
   memory_size   = 128 # Free Tier: 512MB free per month
   timeout       = 3   # Free Tier: 1M requests/month free
 
@@ -133,6 +199,7 @@ resource "aws_lambda_function" "create_item" {
   role          = aws_iam_role.lambda_role.arn
   handler       = "lambda_function.handler"
   runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
   memory_size   = 128 # Free Tier: 512MB free per month
   timeout       = 3   # Free Tier: 1M requests/month free
 
@@ -150,6 +217,7 @@ resource "aws_lambda_function" "delete_item" {
   role          = aws_iam_role.lambda_role.arn
   handler       = "lambda_function.handler"
   runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
   memory_size   = 128 # Free Tier: 512MB free per month
   timeout       = 3   # Free Tier: 1M requests/month free
 
@@ -160,6 +228,105 @@ resource "aws_lambda_function" "delete_item" {
   }
 }
 
+# Lambda Function: API Router (optional) - one function for every
+# knowledge-base route, so warm containers are shared across the API
+resource "aws_lambda_function" "api_router" {
+  count = var.knowledge_base_router ? 1 : 0
+
+  filename      = "${path.module}/../lambda-functions/knowledge-base/api-router/function.zip"
+  function_name = "pkb-api-router"
+  role          = aws_iam_role.lambda_role.arn
+  handler       = "lambda_function.handler"
+  runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
+  memory_size   = 128 # Free Tier: 512MB free per month
+  timeout       = 3   # Free Tier: 1M requests/month free
+
+  environment {
+    variables = {
+      TABLE_NAME         = aws_dynamodb_table.knowledge_base.name
+      ITEMS_SNAPSHOT_URL = local.items_snapshot_url
+    }
+  }
+}
+
+# S3 Bucket for snapshots of the knowledge-base listing
+resource "aws_s3_bucket" "knowledge_base_snapshots" {
+  bucket = "pkb-snapshots-${var.project_name}"
+
+  tags = {
+    Name        = "Knowledge Base Snapshots"
+    Environment = var.environment
+  }
+
+  lifecycle {
+    ignore_changes = [bucket]
+  }
+}
+
+locals {
+  items_snapshot_url = "s3://${aws_s3_bucket.knowledge_base_snapshots.bucket}/knowledge-base/items.json.gz"
+}
+
+# Lambda Function: Snapshot Items - writes the listing get-items starts from
+resource "aws_lambda_function" "snapshot_items" {
+  filename      = "${path.module}/../lambda-functions/knowledge-base/snapshot-items/function.zip"
+  function_name = "pkb-snapshot-items"
+  role          = aws_iam_role.lambda_role.arn
+  handler       = "lambda_function.handler"
+  runtime       = "python3.9"
+  layers        = [aws_lambda_layer_version.shared.arn]
+  memory_size   = 256
+  timeout       = 120
+
+  environment {
+    variables = {
+      TABLE_NAME         = aws_dynamodb_table.knowledge_base.name
+      ITEMS_SNAPSHOT_URL = local.items_snapshot_url
+      AWS_READ_TIMEOUT   = "5"
+      AWS_MAX_ATTEMPTS   = "3"
+    }
+  }
+}
+
+# Take a snapshot every few minutes: the delta get-items queries stays small
+resource "aws_cloudwatch_event_rule" "snapshot_items" {
+  name                = "pkb-snapshot-items"
+  description         = "Snapshot the knowledge-base listing"
+  schedule_expression = "rate(${var.items_snapshot_interval_minutes} minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "snapshot_items" {
+  rule = aws_cloudwatch_event_rule.snapshot_items.name
+  arn  = aws_lambda_function.snapshot_items.arn
+}
+
+resource "aws_lambda_permission" "events_snapshot_items" {
+  statement_id  = "AllowExecutionFromEventBridge"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.snapshot_items.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.snapshot_items.arn
+}
+
+resource "aws_lambda_permission" "api_gateway_api_router" {
+  count = var.knowledge_base_router ? 1 : 0
+
+  statement_id  = "AllowExecutionFromAPIGateway"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.api_router[0].function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*"
+}
+
+# Integration targets: the router for every route, or one function per route
+locals {
+  get_items_invoke_arn   = var.knowledge_base_router ? aws_lambda_function.api_router[0].invoke_arn : aws_lambda_function.get_items.invoke_arn
+  get_changes_invoke_arn = var.knowledge_base_router ? aws_lambda_function.api_router[0].invoke_arn : aws_lambda_function.get_changes.invoke_arn
+  create_item_invoke_arn = var.knowledge_base_router ? aws_lambda_function.api_router[0].invoke_arn : aws_lambda_function.create_item.invoke_arn
+  delete_item_invoke_arn = var.knowledge_base_router ? aws_lambda_function.api_router[0].invoke_arn : aws_lambda_function.delete_item.invoke_arn
+}
+
 # API Gateway
 resource "aws_api_gateway_rest_api" "api" {
   name        = "pkb-api"
@@ -195,7 +362,7 @@ resource "aws_api_gateway_integration" "get_items" {
 
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.get_items.invoke_arn
+  uri                     = local.get_items_invoke_arn
 }
 
 resource "aws_lambda_permission" "api_gateway_get_items" {
@@ -210,6 +377,42 @@ resource "aws_lambda_permission" "api_gateway_get_items" {
   }
 }
 
+# API Gateway: GET /items/changes (takes precedence over /items/{id})
+resource "aws_api_gateway_resource" "item_changes" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  parent_id   = aws_api_gateway_resource.items.id
+  path_part   = "changes"
+}
+
+resource "aws_api_gateway_method" "get_changes" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.item_changes.id
+  http_method   = "GET"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "get_changes" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.item_changes.id
+  http_method = aws_api_gateway_method.get_changes.http_method
+
+  integration_http_method = "POST"
+  type                    = "AWS_PROXY"
+  uri                     = local.get_changes_invoke_arn
+}
+
+resource "aws_lambda_permission" "api_gateway_get_changes" {
+  statement_id  = "AllowExecutionFromAPIGateway"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.get_changes.function_name
+  principal     = "apigateway.amazonaws.com"
+  source_arn    = "${aws_api_gateway_rest_api.api.execution_arn}/*/*"
+
+  lifecycle {
+    create_before_destroy = false
+  }
+}
+
 # API Gateway: POST /items
 resource "aws_api_gateway_method" "create_item" {
   rest_api_id   = aws_api_gateway_rest_api.api.id
@@ -225,7 +428,7 @@ resource "aws_api_gateway_integration" "create_item" {
 
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.create_item.invoke_arn
+  uri                     = local.create_item_invoke_arn
 }
 
 resource "aws_lambda_permission" "api_gateway_create_item" {
@@ -261,7 +464,7 @@ resource "aws_api_gateway_integration" "delete_item" {
 
   integration_http_method = "POST"
   type                    = "AWS_PROXY"
-  uri                     = aws_lambda_function.delete_item.invoke_arn
+  uri                     = local.delete_item_invoke_arn
 }
 
 resource "aws_lambda_permission" "api_gateway_delete_item" {
@@ -374,11 +577,62 @@ resource "aws_api_gateway_integration_response" "options_item" {
   ]
 }
 
+# CORS: OPTIONS for /items/changes
+resource "aws_api_gateway_method" "options_item_changes" {
+  rest_api_id   = aws_api_gateway_rest_api.api.id
+  resource_id   = aws_api_gateway_resource.item_changes.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_item_changes" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.item_changes.id
+  http_method = aws_api_gateway_method.options_item_changes.http_method
+  type        = "MOCK"
+
+  request_templates = {
+    "application/json" = "{\"statusCode\": 200}"
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_item_changes" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.item_changes.id
+  http_method = aws_api_gateway_method.options_item_changes.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Headers" = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_item_changes" {
+  rest_api_id = aws_api_gateway_rest_api.api.id
+  resource_id = aws_api_gateway_resource.item_changes.id
+  http_method = aws_api_gateway_method.options_item_changes.http_method
+  status_code = aws_api_gateway_method_response.options_item_changes.status_code
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+  }
+
+  depends_on = [
+    aws_api_gateway_integration.options_item_changes
+  ]
+}
+
 # Deploy API Gateway
 resource "aws_api_gateway_deployment" "api" {
   depends_on = [
     aws_api_gateway_method.get_items,
     aws_api_gateway_integration.get_items,
+    aws_api_gateway_method.get_changes,
+    aws_api_gateway_integration.get_changes,
     aws_api_gateway_method.create_item,
     aws_api_gateway_integration.create_item,
     aws_api_gateway_method.delete_item,
@@ -387,6 +641,8 @@ resource "aws_api_gateway_deployment" "api" {
     aws_api_gateway_integration.options_items,
     aws_api_gateway_method.options_item,
     aws_api_gateway_integration.options_item,
+    aws_api_gateway_method.options_item_changes,
+    aws_api_gateway_integration.options_item_changes,
     aws_api_gateway_gateway_response.cors,
     aws_api_gateway_gateway_response.cors_5xx
   ]
@@ -397,6 +653,11 @@ resource "aws_api_gateway_deployment" "api" {
     redeployment = sha1(jsonencode([
       aws_api_gateway_resource.items.id,
       aws_api_gateway_resource.item.id,
+      aws_api_gateway_resource.item_changes.id,
+      aws_api_gateway_integration.get_items.uri,
+      aws_api_gateway_integration.get_changes.uri,
+      aws_api_gateway_integration.create_item.uri,
+      aws_api_gateway_integration.delete_item.uri,
       aws_api_gateway_gateway_response.cors.id,
       aws_api_gateway_gateway_response.cors_5xx.id
     ]))
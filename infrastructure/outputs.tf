@@ -24,9 +24,12 @@ output "dynamodb_table_arn" {
 output "lambda_function_names" {
   description = "Names of the Lambda functions"
   value = {
-    get_items   = aws_lambda_function.get_items.function_name
-    create_item = aws_lambda_function.create_item.function_name
-    delete_item = aws_lambda_function.delete_item.function_name
+    get_items      = aws_lambda_function.get_items.function_name
+    get_changes    = aws_lambda_function.get_changes.function_name
+    create_item    = aws_lambda_function.create_item.function_name
+    delete_item    = aws_lambda_function.delete_item.function_name
+    snapshot_items = aws_lambda_function.snapshot_items.function_name
+    api_router     = var.knowledge_base_router ? aws_lambda_function.api_router[0].function_name : null
   }
 }
 
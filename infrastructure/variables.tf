@@ -22,9 +22,39 @@ variable "alert_email" {
   default     = "your-email@example.com"
 }
 
+variable "low_balance_threshold" {
+  description = "Balance below which a budget alert is sent"
+  type        = string
+  default     = "0"
+}
+
+variable "category_budgets" {
+  description = "Monthly spending limit per budget category, e.g. { groceries = 400 }"
+  type        = map(number)
+  default     = {}
+}
+
+variable "alert_cooldown_seconds" {
+  description = "Minimum seconds between two alerts for the same threshold"
+  type        = number
+  default     = 3600
+}
+
 variable "enable_cloudfront" {
   description = "Enable CloudFront distribution to serve static files and API endpoints"
   type        = bool
   default     = true
 }
 
+
+variable "knowledge_base_router" {
+  description = "Serve every knowledge-base API route from the single pkb-api-router function"
+  type        = bool
+  default     = false
+}
+
+variable "items_snapshot_interval_minutes" {
+  description = "Minutes between snapshots of the knowledge-base listing (pkb-snapshot-items)"
+  type        = number
+  default     = 5
+}
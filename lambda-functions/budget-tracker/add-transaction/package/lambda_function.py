@@ -1,100 +1,290 @@
 import json
-import boto3
 import os
+import random
+from botocore.exceptions import ClientError
 from datetime import datetime
 from decimal import Decimal
+from aws_clients import get_client
+from balances import MAX_BALANCE_SHARDS, account_id_from, read_balance, shard_counts, shard_key, to_minor
+from cache import get_cache
+from data_access import get_table, run_blocking, run_sync, transact_write_items
+from http_responses import error_response, json_response, request_body
+from log import get_logger
+from metrics import instrumented
+from tracing import inject_context, traced
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+logger = get_logger(__name__)
 
-def handler(event, context):
+table = get_table(os.environ['TABLE_NAME'])
+
+ALERT_FUNCTION_NAME = os.environ.get('ALERT_FUNCTION_NAME')
+LOW_BALANCE_THRESHOLD = Decimal(os.environ.get('LOW_BALANCE_THRESHOLD', '0'))
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'USD')
+
+# Account balances are write-sharded (see balances.py); the shard count
+# doubles (up to MAX_BALANCE_SHARDS) whenever writes are throttled or keep
+# conflicting with other transactions on the same shard
+THROTTLING_ERRORS = (
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded'
+)
+CONTENTION_REASONS = ('ThrottlingError', 'ProvisionedThroughputExceeded', 'TransactionConflict')
+
+# get-balance's cached responses
+balance_cache = get_cache('balance')
+
+LOW_BALANCE_THRESHOLD_MINOR = to_minor(LOW_BALANCE_THRESHOLD)
+
+# Monthly per-category limits in major units, e.g. {"groceries": 400, "dining": 150}.
+# Each expense ADDs to a spend#<account_id>#<YYYY-MM>#<category> counter that
+# also carries the limit, so one UpdateItem both records and evaluates the rule.
+CATEGORY_BUDGETS = {
+    category: to_minor(limit)
+    for category, limit in json.loads(os.environ.get('CATEGORY_BUDGETS') or '{}').items()
+}
+
+@instrumented
+@traced
+async def handle(event, context):
     """Add a new transaction to the budget tracker."""
     
     try:
-        body = json.loads(event.get('body', '{}'))
+        body = request_body(event)
+        
+        account_id = account_id_from(event, body)
+        if not account_id:
+            return json_response(400, {'error': 'Invalid account id'})
         
         # Extract transaction details
-        # Convert float to Decimal for DynamoDB compatibility
-        amount = Decimal(str(body.get('amount')))
+        # Amounts are stored as integer minor units (cents) with a currency code
+        amount_minor = to_minor(body.get('amount'))
+        currency = body.get('currency', DEFAULT_CURRENCY).upper()
         category = body.get('category', 'other')
         description = body.get('description', '')
         transaction_type = body.get('type', 'expense')  # 'expense' or 'income'
-        transaction_id = body.get('id', f"trans-{datetime.now().isoformat()}")
+        now = datetime.now()
+        transaction_id = body.get('id', f"trans-{now.isoformat()}")
         
         # Create transaction item
         item = {
             'id': transaction_id,
-            'amount': amount,  # Already Decimal
+            'account_id': account_id,
+            'amount_minor': amount_minor,
+            'currency': currency,
             'category': category,
             'description': description,
             'type': transaction_type,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now.isoformat()
         }
         
-        # Store in DynamoDB
-        table.put_item(Item=item)
+        # Store the transaction and apply it to the running balance in one
+        # transaction: a retried POST (same id) is rejected, never counted twice
+        delta = amount_minor if transaction_type == 'income' else -amount_minor
+        balance_minor = await record_transaction(item, delta)
+        if balance_minor is None:
+            return json_response(409, {
+                'error': 'Transaction already exists',
+                'transaction_id': transaction_id
+            })
+        await balance_cache.invalidate(balance_cache_key(account_id))
+        
+        # Track monthly spend per category
+        month = now.strftime('%Y-%m')
+        spend = None
+        if transaction_type == 'expense':
+            spend = await add_category_spend(account_id, month, category, amount_minor)
         
-        # Check balance and send alert if needed (optional - don't fail if this errors)
+        # Hand threshold crossings to send-alert (optional - don't fail if this errors)
         try:
-            if transaction_type == 'expense':
-                # Get current balance
-                balance = get_current_balance(table)
-                
-                # If balance is low, trigger SNS alert
-                if balance < 0:
-                    trigger_alert(table, balance)
+            alert = crossing_alert(balance_minor - delta, balance_minor)
+            if alert:
+                await emit_alert_event({
+                    'alert': alert,
+                    'account_id': account_id,
+                    'threshold': str(LOW_BALANCE_THRESHOLD),
+                    'balance': balance_minor / 100,
+                    'transaction_id': transaction_id
+                })
+            if spend and category_limit_crossed(spend, amount_minor):
+                await emit_alert_event({
+                    'alert': 'category-budget',
+                    'account_id': account_id,
+                    'category': category,
+                    'month': month,
+                    'spent': int(spend['spent_minor']) / 100,
+                    'limit': int(spend['limit_minor']) / 100,
+                    'transaction_id': transaction_id
+                })
         except Exception as alert_error:
             # Don't fail the transaction if alert fails
-            print(f"Alert check failed (non-critical): {alert_error}")
+            logger.warning("Alert event failed (non-critical): %s", alert_error)
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Content-Type': 'application/json'
-            },
-            'body': json.dumps({
-                'message': 'Transaction added successfully',
-                'transaction_id': transaction_id,
-                'balance': float(get_current_balance(table))
-            })
-        }
+        return json_response(200, {
+            'message': 'Transaction added successfully',
+            'transaction_id': transaction_id,
+            'account_id': account_id,
+            'balance': balance_minor / 100,
+            'balance_minor': balance_minor,
+            'currency': currency
+        })
         
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Content-Type': 'application/json'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
+        return error_response(e)
 
-def get_current_balance(table):
-    """Calculate current balance from all transactions."""
-    response = table.scan()
-    balance = Decimal('0')
-    
-    for item in response['Items']:
-        # Convert DynamoDB Decimal to Decimal type
-        amount = item['amount'] if isinstance(item['amount'], Decimal) else Decimal(str(item['amount']))
-        if item['type'] == 'income':
-            balance += amount
-        else:
-            balance -= amount
-    
-    return balance
+def handler(event, context):
+    """Lambda entry point (the HTTP server awaits handle directly)."""
+    return run_sync(handle(event, context))
 
-def trigger_alert(table, balance):
-    """Trigger SNS alert for low balance."""
-    sns = boto3.client('sns')
-    topic_arn = os.environ.get('SNS_TOPIC_ARN')
+def balance_cache_key(account_id):
+    """Cache key of an account's get-balance response."""
+    return f"balance:{table.name}:{account_id}"
+
+async def record_transaction(item, delta):
+    """Put the transaction and ADD delta to a random balance shard atomically.
+
+    Returns the account balance in minor units, or None if a transaction
+    with the same id already exists (nothing is written then).
+    """
+    account_id = item['account_id']
+    count = shard_counts.get(account_id, 1)
+    shard = random.randrange(count)
+    try:
+        await write_transaction(item, shard, delta)
+    except ClientError as e:
+        if is_duplicate(e):
+            return None
+        if not is_contention(e):
+            raise
+        # The hot key is saturated even after botocore's retries: spread wider
+        count = await grow_shards(account_id, count)
+        shard = (shard + random.randrange(1, count)) % count if count > 1 else 0
+        try:
+            await write_transaction(item, shard, delta)
+        except ClientError as e:
+            if is_duplicate(e):
+                return None
+            raise
     
-    if topic_arn:
-        message = f"⚠️ Budget Alert: Your current balance is ${balance:.2f}. You are over budget!"
-        sns.publish(
-            TopicArn=topic_arn,
-            Subject='Budget Alert',
-            Message=message
+    # The write returns no attributes: sum the shards (consistent reads)
+    return (await read_balance(table, account_id))[0]
+
+async def write_transaction(item, shard, delta):
+    """TransactWriteItems: put the item if its id is new, ADD delta to one shard."""
+    await transact_write_items(TransactItems=[
+        {
+            'Put': {
+                'TableName': table.name,
+                'Item': item,
+                'ConditionExpression': 'attribute_not_exists(id)'
+            }
+        },
+        {
+            'Update': {
+                'TableName': table.name,
+                'Key': shard_key(item['account_id'], shard),
+                'UpdateExpression': 'ADD balance_minor :delta, txn_count :one',
+                'ExpressionAttributeValues': {':delta': delta, ':one': 1}
+            }
+        }
+    ])
+
+def cancellation_codes(error):
+    """Per-action reason codes of a cancelled transaction (empty for other errors)."""
+    if error.response['Error']['Code'] != 'TransactionCanceledException':
+        return []
+    return [reason.get('Code') for reason in error.response.get('CancellationReasons') or []]
+
+def is_duplicate(error):
+    """True if the put was cancelled because the transaction id exists."""
+    codes = cancellation_codes(error)
+    return bool(codes) and codes[0] == 'ConditionalCheckFailed'
+
+def is_contention(error):
+    """True if the write was throttled or conflicted with a concurrent transaction."""
+    if error.response['Error']['Code'] in THROTTLING_ERRORS:
+        return True
+    return any(code in CONTENTION_REASONS for code in cancellation_codes(error))
+
+async def grow_shards(account_id, count):
+    """Double the account's shard count (bounded) and return the new count."""
+    target = min(max(count, 1) * 2, MAX_BALANCE_SHARDS)
+    try:
+        await table.update_item(
+            Key=shard_key(account_id, 0),
+            UpdateExpression='SET shard_count = :target',
+            ConditionExpression='attribute_not_exists(shard_count) OR shard_count < :target',
+            ExpressionAttributeValues={':target': target}
         )
+        logger.info("Balance shards for %s grown to %s", account_id, target)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        # Another container already grew it
+        item = (await table.get_item(Key=shard_key(account_id, 0))).get('Item', {})
+        target = max(target, int(item.get('shard_count', 1)))
+    shard_counts[account_id] = target
+    return target
+
+async def add_category_spend(account_id, month, category, amount_minor):
+    """ADD the expense to its category-month counter and return the counter."""
+    update = 'ADD spent_minor :amount'
+    values = {':amount': amount_minor}
+    if category in CATEGORY_BUDGETS:
+        # The first write of the month copies the configured limit onto the counter
+        update += ' SET limit_minor = if_not_exists(limit_minor, :limit)'
+        values[':limit'] = CATEGORY_BUDGETS[category]
+    response = await table.update_item(
+        Key={'id': f"spend#{account_id}#{month}#{category}"},
+        UpdateExpression=update,
+        ExpressionAttributeValues=values,
+        ReturnValues='ALL_NEW'
+    )
+    return response['Attributes']
+
+def category_limit_crossed(spend, amount_minor):
+    """True if this expense took the category-month spend over its limit."""
+    if 'limit_minor' not in spend:
+        return False
+    spent = int(spend['spent_minor'])
+    limit = int(spend['limit_minor'])
+    return spent - amount_minor <= limit < spent
+
+def crossing_alert(previous, balance):
+    """Return the alert type if this write crossed the low-balance threshold."""
+    # previous is derived from this write's own delta; with several shards
+    # concurrent writers may both observe a crossing, and send-alert's state
+    # item drops the duplicate. Writes that stay on one side emit nothing
+    if previous >= LOW_BALANCE_THRESHOLD_MINOR > balance:
+        return 'low-balance'
+    if previous < LOW_BALANCE_THRESHOLD_MINOR <= balance:
+        return 'low-balance-recovered'
+    return None
+
+async def emit_alert_event(alert):
+    """Invoke send-alert asynchronously with the alert event."""
+    if not ALERT_FUNCTION_NAME:
+        # Local stand-in (docker/tests): no alert function, just log the event
+        logger.info("Alert event: %s", json.dumps(alert))
+        return
+    
+    # Alert checks are handed to send-alert asynchronously; keep the enqueue call
+    # short so the Lambda service can never hold up the transaction response
+    lambda_client = get_client(
+        'lambda',
+        connect_timeout=1,
+        read_timeout=1,
+        retries={'mode': 'standard', 'max_attempts': 1}
+    )
+    # Carry the trace over so send-alert's spans join this request's trace
+    trace_context = inject_context()
+    if trace_context:
+        alert = dict(alert, trace_context=trace_context)
+    # In server mode the blocking invoke runs off the event loop
+    await run_blocking(
+        lambda_client.invoke,
+        FunctionName=ALERT_FUNCTION_NAME,
+        InvocationType='Event',
+        Payload=json.dumps(alert).encode('utf-8')
+    )
 
@@ -1,68 +1,90 @@
-import json
-import boto3
 import os
-from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+from balances import account_id_from, read_balance, to_minor
+from cache import get_cache
+from data_access import get_table, run_sync
+from http_responses import CORS_HEADERS, dumps, error_response, json_response
+from metrics import instrumented
+from tracing import traced
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table(os.environ['TABLE_NAME'])
 
-def handler(event, context):
-    """Get current balance and recent transactions."""
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'USD')
+
+# GSI partitioned by account_id and sorted by timestamp
+ACCOUNT_INDEX = 'AccountIndex'
+RECENT_LIMIT = 20
+
+# Read-through cache of each account's response (CACHE_BACKEND); concurrent
+# misses for an account share one read, and add-transaction invalidates its key
+balance_cache = get_cache('balance')
+BALANCE_CACHE_TTL = int(os.environ.get('BALANCE_CACHE_TTL', '10'))
+
+@instrumented
+@traced
+async def handle(event, context):
+    """Get current balance and recent transactions for one account."""
     
     try:
-        # Scan for all transactions
-        response = table.scan()
-        
-        balance = Decimal('0')
-        transactions = []
-        
-        # Calculate balance and prepare transaction list
-        for item in response['Items']:
-            # Convert amount to float for JSON serialization
-            amount_value = float(item['amount']) if isinstance(item['amount'], Decimal) else item['amount']
-            
-            transactions.append({
-                'id': item['id'],
-                'amount': amount_value,
-                'category': item['category'],
-                'description': item['description'],
-                'type': item['type'],
-                'timestamp': item['timestamp']
-            })
-            
-            # Use Decimal for calculations
-            amount = item['amount'] if isinstance(item['amount'], Decimal) else Decimal(str(item['amount']))
-            if item['type'] == 'income':
-                balance += amount
-            else:
-                balance -= amount
-        
-        # Sort by timestamp (most recent first)
-        transactions.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        # Limit to last 20 transactions
-        recent_transactions = transactions[:20]
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Content-Type': 'application/json'
-            },
-            'body': json.dumps({
-                'balance': float(balance),  # Convert Decimal to float for JSON
-                'transactions': recent_transactions,
-                'total_count': len(transactions)
-            }, default=str)  # Handle Decimal type in JSON serialization
-        }
+        account_id = account_id_from(event)
+        if not account_id:
+            return json_response(400, {'error': 'Invalid account id'})
         
+        body = await balance_cache.get_or_load(
+            balance_cache_key(account_id), BALANCE_CACHE_TTL, lambda: balance_body(account_id)
+        )
+        return {'statusCode': 200, 'headers': dict(CORS_HEADERS), 'body': body}
+    
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Content-Type': 'application/json'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
+        return error_response(e)
+
+def handler(event, context):
+    """Lambda entry point (the HTTP server awaits handle directly)."""
+    return run_sync(handle(event, context))
+
+async def balance_body(account_id):
+    """Read the balance and recent transactions; returns the response body."""
+    # Balance and count come from the account's shards - no table scan
+    balance_minor, txn_count = await read_balance(table, account_id)
+    
+    # Most recent transactions straight from the account partition
+    response = await table.query(
+        IndexName=ACCOUNT_INDEX,
+        KeyConditionExpression=Key('account_id').eq(account_id),
+        ScanIndexForward=False,
+        Limit=RECENT_LIMIT
+    )
+    
+    recent_transactions = []
+    for item in response['Items']:
+        amount_minor = minor_amount(item)
+        recent_transactions.append({
+            'id': item['id'],
+            'amount': amount_minor / 100,
+            'amount_minor': amount_minor,
+            'currency': item.get('currency', DEFAULT_CURRENCY),
+            'category': item['category'],
+            'description': item['description'],
+            'type': item['type'],
+            'timestamp': item['timestamp']
+        })
+    
+    return dumps({
+        'account_id': account_id,
+        'balance': balance_minor / 100,
+        'balance_minor': balance_minor,
+        'currency': DEFAULT_CURRENCY,
+        'transactions': recent_transactions,
+        'total_count': txn_count
+    })
+
+def balance_cache_key(account_id):
+    """Cache key of an account's get-balance response (shared with add-transaction)."""
+    return f"balance:{table.name}:{account_id}"
 
+def minor_amount(item):
+    """Return the item amount in integer minor units (cents)."""
+    if 'amount_minor' in item:
+        return int(item['amount_minor'])
+    # Rows written before the minor-unit migration
+    return to_minor(item['amount'])
@@ -0,0 +1,457 @@
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from urllib.parse import unquote_plus
+
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client, get_resource, get_table
+from balances import ACCOUNT_ID_PATTERN, DEFAULT_ACCOUNT_ID, MAX_BALANCE_SHARDS, shard_key, to_minor
+from http_responses import error_response, json_response
+from log import get_logger
+from metrics import instrumented
+from tracing import traced
+
+logger = get_logger(__name__)
+
+dynamodb = get_resource('dynamodb')
+TABLE_NAME = os.environ.get('TABLE_NAME', 'BudgetTracker')
+table = get_table(TABLE_NAME)
+
+# Statements belong to an account: S3 keys are <account_id>/<file>, and keys
+# without a prefix go to the default account. Batch deltas go to balance
+# shard 0 (balance#<account_id>); see balances.py
+
+# Bookkeeping items (balance shards, alert state, category spend) share the table
+RESERVED_PREFIXES = ('balance#', 'alert#', 'spend#')
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'USD')
+
+# Rows per TransactWriteItems call: 25 puts plus the balance and spend
+# counter updates stay under its 100-action limit
+BATCH_SIZE = 25
+MAX_RETRIES = 8
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+CSV_COLUMNS = {
+    'date': ('date', 'posted', 'posting date', 'transaction date', 'booking date'),
+    'description': ('description', 'memo', 'payee', 'name', 'details'),
+    'amount': ('amount', 'value', 'transaction amount'),
+    'category': ('category',),
+    'type': ('type',),
+    'currency': ('currency',),
+}
+
+
+@instrumented
+@traced
+def handler(event, context):
+    """
+    Import a bank statement (CSV or OFX) stored in S3.
+
+    Accepts either an S3 put notification or a direct invocation with
+    {"bucket": ..., "key": ..., "account_id": ...}.
+    """
+    try:
+        if 'Records' in event:
+            # Keys in S3 notifications are URL-encoded (spaces arrive as '+')
+            objects = [
+                (record['s3']['bucket']['name'], unquote_plus(record['s3']['object']['key']))
+                for record in event['Records']
+            ]
+        else:
+            objects = [(event['bucket'], event['key'])]
+        account_override = event.get('account_id')
+
+        s3 = get_client('s3')
+        results = []
+        for bucket, key in objects:
+            body = s3.get_object(Bucket=bucket, Key=key)['Body']
+            lines = (line.decode('utf-8-sig') for line in body.iter_lines())
+            account_id = account_override or account_for_key(key)
+            result = import_statement(lines, detect_format(key), account_id)
+            result['source'] = f"s3://{bucket}/{key}"
+            logger.info("Imported statement: %s", json.dumps(result))
+            results.append(result)
+
+        return json_response(200, {'message': 'Import completed', 'results': results})
+
+    except Exception as e:
+        return error_response(e)
+
+
+def detect_format(name):
+    """Pick a parser from the file extension."""
+    return 'ofx' if name.lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+
+def account_for_key(key):
+    """Derive the account id from the first segment of the S3 key."""
+    return key.split('/', 1)[0] if '/' in key else DEFAULT_ACCOUNT_ID
+
+
+def import_statement(lines, fmt, account_id=DEFAULT_ACCOUNT_ID):
+    """Stream-parse a statement and write it to DynamoDB in batches."""
+    if not ACCOUNT_ID_PATTERN.match(account_id):
+        raise ValueError(f"Invalid account id: {account_id!r}")
+    records = parse_ofx(lines, account_id) if fmt == 'ofx' else parse_csv(lines, account_id)
+    totals = {'imported': 0, 'duplicates': 0, 'batches': 0, 'balance_delta_minor': 0}
+
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == BATCH_SIZE:
+            write_batch(batch, account_id, totals)
+            batch = []
+    if batch:
+        write_batch(batch, account_id, totals)
+
+    return totals
+
+
+def write_batch(records, account_id, totals):
+    """Insert one batch of new transactions together with its balance delta."""
+    # Rows repeated within the batch or already stored are duplicates. The
+    # read only saves transactions on re-imports: the conditional puts below
+    # are what apply each row - and its amount - exactly once
+    unique = {}
+    for record in records:
+        unique.setdefault(record['id'], record)
+    existing = existing_ids(list(unique))
+    new_items = insert_items(
+        [item for item_id, item in unique.items() if item_id not in existing],
+        account_id
+    )
+    totals['duplicates'] += len(records) - len(new_items)
+
+    if not new_items:
+        return
+
+    totals['imported'] += len(new_items)
+    totals['batches'] += 1
+    totals['balance_delta_minor'] += balance_delta(new_items)
+
+
+def insert_items(items, account_id):
+    """Put the items that do not exist yet and apply their deltas in one transaction.
+
+    Returns the items inserted. Rows another import wrote in the meantime
+    fail their condition and are dropped before the transaction is retried,
+    so the balance only ever counts rows this call inserted.
+    """
+    for attempt in range(MAX_RETRIES):
+        if not items:
+            return []
+        try:
+            dynamodb.meta.client.transact_write_items(TransactItems=transaction(items, account_id))
+            return items
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            # One reason per action, in order: the puts come first
+            reasons = e.response.get('CancellationReasons') or []
+            stored = {
+                item['id'] for item, reason in zip(items, reasons)
+                if reason.get('Code') == 'ConditionalCheckFailed'
+            }
+            if stored:
+                items = [item for item in items if item['id'] not in stored]
+                continue
+        # Conflict with a concurrent transaction (or throttling): back off
+        time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+    raise RuntimeError('TransactWriteItems kept conflicting after retries')
+
+
+def transaction(items, account_id):
+    """TransactWriteItems actions: a conditional put per item, then the counter ADDs."""
+    actions = [
+        {
+            'Put': {
+                'TableName': TABLE_NAME,
+                'Item': item,
+                'ConditionExpression': 'attribute_not_exists(id)'
+            }
+        }
+        for item in items
+    ]
+    actions.append({
+        'Update': {
+            'TableName': TABLE_NAME,
+            'Key': shard_key(account_id, 0),
+            'UpdateExpression': 'ADD balance_minor :delta, txn_count :count',
+            'ExpressionAttributeValues': {':delta': balance_delta(items), ':count': len(items)}
+        }
+    })
+    # Category-month spend counters (see add-transaction), one ADD per group
+    for key, amount_minor in category_spend(items).items():
+        actions.append({
+            'Update': {
+                'TableName': TABLE_NAME,
+                'Key': {'id': key},
+                'UpdateExpression': 'ADD spent_minor :amount',
+                'ExpressionAttributeValues': {':amount': amount_minor}
+            }
+        })
+    return actions
+
+
+def balance_delta(items):
+    """Net effect of the items on the balance, in minor units."""
+    return sum(
+        item['amount_minor'] if item['type'] == 'income' else -item['amount_minor']
+        for item in items
+    )
+
+
+def category_spend(items):
+    """Sum expenses per spend#<account_id>#<YYYY-MM>#<category> counter."""
+    spend = {}
+    for item in items:
+        if item['type'] == 'expense':
+            key = f"spend#{item['account_id']}#{item['timestamp'][:7]}#{item['category']}"
+            spend[key] = spend.get(key, 0) + item['amount_minor']
+    return spend
+
+
+def existing_ids(ids):
+    """Return the subset of ids already present in the table."""
+    found = set()
+    request = {TABLE_NAME: {'Keys': [{'id': item_id} for item_id in ids], 'ProjectionExpression': 'id'}}
+    for attempt in range(MAX_RETRIES):
+        response = dynamodb.batch_get_item(RequestItems=request)
+        found.update(item['id'] for item in response['Responses'].get(TABLE_NAME, []))
+        request = response.get('UnprocessedKeys')
+        if not request:
+            return found
+        time.sleep(0.05 * 2 ** attempt)
+    raise RuntimeError('BatchGetItem left unprocessed keys after retries')
+
+
+def parse_csv(lines, account_id):
+    """Yield transaction items from CSV lines with a header row."""
+    reader = csv.reader(lines)
+    header = [column.strip().lower() for column in next(reader, [])]
+    columns = {}
+    for field, names in CSV_COLUMNS.items():
+        for index, column in enumerate(header):
+            if column in names:
+                columns[field] = index
+                break
+    if 'date' not in columns or 'amount' not in columns:
+        raise ValueError(f"CSV header must include date and amount columns, got: {header}")
+
+    seen = {}
+    for row in reader:
+        if not row or not any(cell.strip() for cell in row):
+            continue
+
+        def cell(field, default=''):
+            index = columns.get(field)
+            return row[index].strip() if index is not None and index < len(row) else default
+
+        yield build_item(
+            account_id=account_id,
+            date=cell('date'),
+            amount=cell('amount'),
+            description=cell('description'),
+            category=cell('category') or 'other',
+            transaction_type=cell('type').lower() or None,
+            currency=cell('currency') or DEFAULT_CURRENCY,
+            external_id=None,
+            seen=seen
+        )
+
+
+def parse_ofx(lines, account_id):
+    """Yield transaction items from OFX (SGML or XML) lines."""
+    seen = {}
+    current = None
+    currency = DEFAULT_CURRENCY
+    for line in lines:
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'CURDEF' and value.strip():
+                currency = value.strip()
+            elif tag == 'STMTTRN':
+                if closing and current is not None:
+                    yield build_item(
+                        account_id=account_id,
+                        date=current.get('DTPOSTED', ''),
+                        amount=current.get('TRNAMT', ''),
+                        description=current.get('NAME') or current.get('MEMO', ''),
+                        category='other',
+                        transaction_type=None,
+                        currency=current.get('CURRENCY', currency),
+                        external_id=current.get('FITID'),
+                        seen=seen
+                    )
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+def build_item(account_id, date, amount, description, category, transaction_type, currency, external_id, seen):
+    """Normalize one statement row into a transaction item with a deterministic id."""
+    try:
+        value = Decimal(amount.replace(',', '').replace('$', ''))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount in statement row: {amount!r}")
+
+    if transaction_type not in ('income', 'expense'):
+        transaction_type = 'income' if value > 0 else 'expense'
+
+    timestamp = parse_date(date)
+
+    if external_id:
+        key = f"fitid|{external_id}"
+    else:
+        key = f"{timestamp}|{value}|{description}"
+        # Identical rows on the same statement are distinct transactions
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        key = f"{key}|{occurrence}"
+    if account_id != DEFAULT_ACCOUNT_ID:
+        # Unprefixed keys keep the ids of imports made before accounts existed
+        key = f"{account_id}|{key}"
+
+    return {
+        'id': f"import-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]}",
+        'account_id': account_id,
+        'amount_minor': to_minor(abs(value)),
+        'currency': currency.upper(),
+        'category': category,
+        'description': description,
+        'type': transaction_type,
+        'timestamp': timestamp
+    }
+
+
+def parse_date(value):
+    """Parse the date formats banks commonly export into an ISO timestamp."""
+    value = value.strip()
+    if re.match(r'^\d{8}', value):  # OFX: YYYYMMDD[HHMMSS[.XXX]][TZ]
+        return datetime.strptime(value[:8], '%Y%m%d').isoformat()
+    for fmt in ('%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%m/%d/%Y', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(value, fmt).isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date in statement row: {value!r}")
+
+
+def scan_transactions():
+    """Yield every stored transaction, skipping bookkeeping items."""
+    scan_kwargs = {}
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response['Items']:
+            if not item['id'].startswith(RESERVED_PREFIXES):
+                yield item
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def migrate_rows():
+    """Bring legacy rows to the current schema: minor units, currency and account id."""
+    migrated = 0
+    for item in scan_transactions():
+        if 'amount_minor' in item and 'account_id' in item:
+            continue
+        values = {
+            ':currency': item.get('currency', DEFAULT_CURRENCY),
+            ':account': item.get('account_id', DEFAULT_ACCOUNT_ID)
+        }
+        update = 'SET currency = :currency, account_id = :account'
+        if 'amount_minor' not in item:
+            update += ', amount_minor = :minor REMOVE amount'
+            values[':minor'] = to_minor(item['amount'])
+        table.update_item(
+            Key={'id': item['id']},
+            UpdateExpression=update,
+            ExpressionAttributeValues=values
+        )
+        migrated += 1
+    return migrated
+
+
+def rebuild_balances():
+    """Recompute every account balance and category spend counter from the stored transactions."""
+    accounts = {}
+    spend = {}
+    for item in scan_transactions():
+        if 'amount_minor' in item:
+            amount_minor = int(item['amount_minor'])
+        else:
+            amount_minor = to_minor(item['amount'])
+        account_id = item.get('account_id', DEFAULT_ACCOUNT_ID)
+        totals = accounts.setdefault(account_id, [0, 0])
+        totals[0] += amount_minor if item['type'] == 'income' else -amount_minor
+        totals[1] += 1
+        if item['type'] == 'expense':
+            key = f"spend#{account_id}#{item['timestamp'][:7]}#{item['category']}"
+            spend[key] = spend.get(key, 0) + amount_minor
+
+    # SET keeps any limit_minor already copied onto the counter
+    for key, amount_minor in spend.items():
+        table.update_item(
+            Key={'id': key},
+            UpdateExpression='SET spent_minor = :amount',
+            ExpressionAttributeValues={':amount': amount_minor}
+        )
+
+    for account_id, (balance_minor, count) in accounts.items():
+        # Collapse write shards (balance#<account_id>#<n>) back into shard 0
+        for shard in range(1, MAX_BALANCE_SHARDS):
+            table.delete_item(Key=shard_key(account_id, shard))
+        table.put_item(Item={
+            **shard_key(account_id, 0),
+            'balance_minor': balance_minor,
+            'txn_count': count
+        })
+    return accounts
+
+
+def main(argv):
+    # CLI only - not needed when running as a Lambda
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Import bank statements into the budget tracker.')
+    parser.add_argument('statements', nargs='*', help='CSV or OFX files to import')
+    parser.add_argument('--account', default=DEFAULT_ACCOUNT_ID, help='account the statements belong to')
+    parser.add_argument('--migrate', action='store_true',
+                        help='convert legacy rows (Decimal amounts, no account) and rebuild balances')
+    parser.add_argument('--rebuild-balance', action='store_true',
+                        help='recompute the balance aggregate of every account')
+    args = parser.parse_args(argv)
+
+    if args.migrate:
+        print(f"Migrated {migrate_rows()} transactions")
+    if args.migrate or args.rebuild_balance:
+        for account_id, (balance_minor, count) in rebuild_balances().items():
+            print(f"{account_id}: balance {balance_minor / 100:.2f} over {count} transactions")
+        return 0
+    if not args.statements:
+        parser.print_usage()
+        return 2
+
+    for path in args.statements:
+        started = time.perf_counter()
+        with open(path, newline='', encoding='utf-8-sig') as statement:
+            result = import_statement(statement, detect_format(path), args.account)
+        result['seconds'] = round(time.perf_counter() - started, 2)
+        print(f"{path}: {json.dumps(result)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,11 +1,31 @@
-import json
-import boto3
 import os
+import time
+from aws_clients import get_client, get_resource, get_table
+from http_responses import error_response, json_response, request_body
+from metrics import instrumented
+from tracing import traced
 
-sns = boto3.client('sns')
+# The SNS client is built on first publish (get_client caches it): duplicate
+# and cooling-down alert events only touch DynamoDB, so they skip its init
+dynamodb = get_resource('dynamodb')
+table = get_table(os.environ.get('TABLE_NAME', 'BudgetTracker'))
 
+# Minimum time between two alerts for the same threshold
+ALERT_COOLDOWN_SECONDS = int(os.environ.get('ALERT_COOLDOWN_SECONDS', '3600'))
+
+# SNS PublishBatch accepts at most 10 entries per call
+PUBLISH_BATCH_SIZE = 10
+MAX_CONCURRENT_BATCHES = 4
+
+@instrumented
+@traced
 def handler(event, context):
-    """Send budget alert via SNS."""
+    """Send budget alert via SNS.
+
+    Invoked through API Gateway (message in the request body), directly
+    with {"alerts": [...]} for a burst of alerts, or asynchronously by
+    add-transaction with an alert event.
+    """
     
     try:
         # Get environment variables
@@ -13,42 +33,161 @@ def handler(event, context):
         sns_enabled = os.environ.get('SNS_ENABLED', 'true').lower() == 'true'
         
         if not sns_enabled:
-            return {
-                'statusCode': 200,
-                'body': json.dumps({'message': 'SNS alerts disabled'})
-            }
+            return json_response(200, {'message': 'SNS alerts disabled'})
         
-        # Parse event
-        body = json.loads(event.get('body', '{}'))
-        subject = body.get('subject', 'Budget Alert')
-        message = body.get('message', '')
+        alert_id = None
+        if 'alert' in event:
+            # Asynchronous threshold crossing from add-transaction
+            account_id = event.get('account_id', 'default')
+            if event['alert'] == 'category-budget':
+                # One alert per category and month
+                alert_id = f"alert#{account_id}#category#{event['category']}#{event['month']}"
+                message = (
+                    f"⚠️ Budget Alert: {event['category']} spending for {event['month']} ({account_id}) "
+                    f"is ${event['spent']:.2f}, over the ${event['limit']:.2f} limit."
+                )
+            else:
+                alert_id = f"alert#{account_id}#low-balance#{event['threshold']}"
+                message = f"⚠️ Budget Alert: Your current balance ({account_id}) is ${event['balance']:.2f}. You are over budget!"
+            
+            if event['alert'] == 'low-balance-recovered':
+                reset_alert(alert_id)
+                return json_response(200, {'message': 'Alert state reset'})
+            
+            previous = claim_alert(alert_id)
+            if previous is None:
+                return json_response(200, {'message': 'Alert already sent or cooling down'})
+            subject = 'Budget Alert'
+        else:
+            # Parse event
+            body = event if 'alerts' in event else request_body(event)
+            if 'alerts' in body:
+                return publish_alerts(topic_arn, body['alerts'])
+            subject = body.get('subject', 'Budget Alert')
+            message = body.get('message', '')
         
         # Send SNS notification
-        response = sns.publish(
-            TopicArn=topic_arn,
-            Subject=subject,
-            Message=message
-        )
+        try:
+            response = get_client('sns').publish(
+                TopicArn=topic_arn,
+                Subject=subject,
+                Message=message
+            )
+        except Exception:
+            if alert_id:
+                # Give the alert back so a retry can send it
+                release_alert(alert_id, previous)
+            raise
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Content-Type': 'application/json'
-            },
-            'body': json.dumps({
-                'message': 'Alert sent successfully',
-                'message_id': response['MessageId']
-            })
-        }
+        return json_response(200, {
+            'message': 'Alert sent successfully',
+            'message_id': response['MessageId']
+        })
         
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Content-Type': 'application/json'
-            },
-            'body': json.dumps({'error': str(e)})
+        if 'alert' in event:
+            # Let Lambda retry failed asynchronous deliveries
+            raise
+        return error_response(e)
+
+
+def publish_alerts(topic_arn, alerts):
+    """Publish a list of alerts with SNS PublishBatch, 10 per call, groups in parallel."""
+    entries = [
+        {
+            'Id': str(index),
+            'Subject': alert.get('subject', 'Budget Alert'),
+            'Message': alert.get('message', '')
         }
+        for index, alert in enumerate(alerts)
+    ]
+    groups = [entries[i:i + PUBLISH_BATCH_SIZE] for i in range(0, len(entries), PUBLISH_BATCH_SIZE)]
+    
+    # Only bursts need the thread pool; keep it out of the cold-start imports
+    from concurrent.futures import ThreadPoolExecutor
+    
+    # Build the client before the workers start: they share it (clients are
+    # thread-safe, creating them from the default session is not)
+    sns = get_client('sns')
+    results = [None] * len(entries)
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES) as executor:
+        for group, outcome in zip(groups, executor.map(lambda g: publish_group(sns, topic_arn, g), groups)):
+            for entry_id, result in outcome.items():
+                results[int(entry_id)] = result
+    
+    failed = sum(1 for result in results if result['status'] == 'failed')
+    # 207 tells API callers to inspect the per-entry results
+    status_code = 207 if failed and failed < len(results) else (500 if failed else 200)
+    return json_response(status_code, {
+        'message': f"Sent {len(results) - failed} of {len(results)} alerts",
+        'batches': len(groups),
+        'results': results
+    })
+
+def publish_group(sns, topic_arn, group):
+    """Send one PublishBatch call and map every entry id to its outcome."""
+    try:
+        response = sns.publish_batch(TopicArn=topic_arn, PublishBatchRequestEntries=group)
+    except Exception as e:
+        return {entry['Id']: {'index': int(entry['Id']), 'status': 'failed', 'error': str(e)} for entry in group}
+    
+    outcome = {}
+    for success in response.get('Successful', []):
+        outcome[success['Id']] = {
+            'index': int(success['Id']),
+            'status': 'sent',
+            'message_id': success['MessageId']
+        }
+    for failure in response.get('Failed', []):
+        outcome[failure['Id']] = {
+            'index': int(failure['Id']),
+            'status': 'failed',
+            'error': failure.get('Message', failure.get('Code', 'unknown error'))
+        }
+    return outcome
+
+def claim_alert(alert_id):
+    """Mark the alert as firing if it is idle and outside the cooldown window.
+
+    Returns the previous state attributes, or None if the alert already
+    fired (duplicate delivery) or fired too recently.
+    """
+    now = int(time.time())
+    try:
+        response = table.update_item(
+            Key={'id': alert_id},
+            UpdateExpression='SET alert_state = :firing, last_sent_at = :now',
+            ConditionExpression=(
+                '(attribute_not_exists(alert_state) OR alert_state = :ok) AND '
+                '(attribute_not_exists(last_sent_at) OR last_sent_at < :cutoff)'
+            ),
+            ExpressionAttributeValues={
+                ':firing': 'firing',
+                ':ok': 'ok',
+                ':now': now,
+                ':cutoff': now - ALERT_COOLDOWN_SECONDS
+            },
+            ReturnValues='UPDATED_OLD'
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+    return response.get('Attributes', {})
+
+def release_alert(alert_id, previous):
+    """Restore the alert state captured by claim_alert."""
+    if 'last_sent_at' in previous:
+        table.update_item(
+            Key={'id': alert_id},
+            UpdateExpression='SET alert_state = :ok, last_sent_at = :last',
+            ExpressionAttributeValues={':ok': 'ok', ':last': previous['last_sent_at']}
+        )
+    else:
+        table.delete_item(Key={'id': alert_id})
 
+def reset_alert(alert_id):
+    """Re-arm the alert once the balance is back above the threshold."""
+    table.update_item(
+        Key={'id': alert_id},
+        UpdateExpression='SET alert_state = :ok',
+        ExpressionAttributeValues={':ok': 'ok'}
+    )
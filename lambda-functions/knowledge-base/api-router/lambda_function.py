@@ -0,0 +1,92 @@
+import importlib
+import importlib.util
+import os
+import re
+from http_responses import json_response
+from log import get_logger
+
+logger = get_logger(__name__)
+
+# One function for the whole knowledge-base API: every warm container serves
+# every route, instead of get-items, get-changes, create-item and delete-item
+# each keeping (and cold-starting) their own pool. The routes run the
+# unchanged handlers, which build/package as get_items.py, get_changes.py,
+# create_item.py and delete_item.py next to this file (scripts/build-lambda.sh).
+ROUTED_FUNCTIONS = {
+    'get-items': 'pkb-api-get-items',
+    'get-changes': 'pkb-api-get-changes',
+    'create-item': 'pkb-api-create-item',
+    'delete-item': 'pkb-api-delete-item'
+}
+
+# Requests without an API Gateway resource (direct invokes) match on the path
+PATH_PATTERNS = [
+    ('/items/changes', re.compile(r'/items/changes/?$')),
+    ('/items/{id}', re.compile(r'/items/(?P<id>[^/]+)/?$')),
+    ('/items', re.compile(r'/items/?$'))
+]
+
+def load_handler(function_dir):
+    """Import a routed handler: bundled in the package, or from the source tree."""
+    module_name = function_dir.replace('-', '_')
+    try:
+        return importlib.import_module(module_name).handler
+    except ModuleNotFoundError as e:
+        if e.name != module_name:
+            raise
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', function_dir, 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+HANDLERS = {function_dir: load_handler(function_dir) for function_dir in ROUTED_FUNCTIONS}
+
+ROUTES = {
+    '/items': {'GET': 'get-items', 'POST': 'create-item'},
+    '/items/changes': {'GET': 'get-changes'},
+    '/items/{id}': {'DELETE': 'delete-item'}
+}
+
+class RouteContext:
+    """The Lambda context, reporting the routed function's name.
+
+    Metrics and traces keep the per-function names the dashboards use.
+    """
+
+    def __init__(self, context, function_name):
+        self._context = context
+        self.function_name = function_name
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+def match_route(event):
+    """Return (resource, path parameters) for the request, or (None, None)."""
+    resource = event.get('resource')
+    if resource in ROUTES:
+        return resource, event.get('pathParameters')
+    path = event.get('path') or ''
+    for resource, pattern in PATH_PATTERNS:
+        match = pattern.search(path)
+        if match:
+            return resource, match.groupdict() or event.get('pathParameters')
+    return None, None
+
+def handler(event, context):
+    """Dispatch an API Gateway request to the knowledge-base handler for its route."""
+    resource, path_params = match_route(event)
+    if resource is None:
+        return json_response(404, {'error': f"No route for {event.get('path')}"})
+    
+    method = (event.get('httpMethod') or '').upper()
+    function_dir = ROUTES[resource].get(method)
+    if function_dir is None:
+        return json_response(405, {'error': f"Method {method} not allowed on {resource}"}, headers={
+            'Allow': ', '.join(sorted(ROUTES[resource]))
+        })
+    
+    logger.debug("Routing %s %s to %s", method, resource, function_dir)
+    if path_params != event.get('pathParameters'):
+        event = dict(event, pathParameters=path_params)
+    return HANDLERS[function_dir](event, RouteContext(context, ROUTED_FUNCTIONS[function_dir]))
@@ -1,82 +1,83 @@
-import json
-import boto3
 import os
+import time
+from botocore.exceptions import ClientError
+from datetime import datetime
+from cache import get_cache
+from data_access import get_table, run_sync
+from http_responses import error_response, json_response
+from log import get_logger
+from metrics import instrumented
+from tracing import traced
 
-# DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+logger = get_logger(__name__)
+
+# DynamoDB table (sync boto3 on Lambda, aiobotocore in server mode)
 TABLE_NAME = os.environ.get('TABLE_NAME', 'PersonalKnowledgeBase')
-table = dynamodb.Table(TABLE_NAME)
+table = get_table(TABLE_NAME)
 
-def handler(event, context):
+# get-items' cached listing
+items_cache = get_cache('items')
+ITEMS_CACHE_KEY = f"items:{TABLE_NAME}"
+
+# Deleted items become tombstones in UpdatedAtIndex (see create-item), so
+# readers of the changes since a snapshot see the deletion. DynamoDB TTL
+# removes them after TOMBSTONE_TTL_DAYS - longer than any snapshot is used.
+LISTING = 'items'
+TOMBSTONE_TTL_DAYS = int(os.environ.get('TOMBSTONE_TTL_DAYS', '7'))
+
+@instrumented
+@traced
+async def handle(event, context):
     """
     Lambda function to delete an item from DynamoDB
     """
     try:
-        # Debug: log the event structure
-        print(f"Event received: {json.dumps(event)}")
+        # Debug: log the event structure (LOG_LEVEL=DEBUG)
+        logger.debug("Event received: %s", event)
         
         # Get item ID from path parameters
         path_params = event.get('pathParameters', {})
         item_id = path_params.get('id') if path_params else None
         
         if not item_id:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Missing item ID',
-                    'event': event
-                })
-            }
-        
-        # Delete item from DynamoDB
-        response = table.delete_item(
-            Key={'id': item_id},
-            ReturnValues='ALL_OLD'
-        )
-        
-        if 'Attributes' not in response:
-            return {
-                'statusCode': 404,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
-                    'error': 'Item not found'
-                })
-            }
+            return json_response(400, {
+                'error': 'Missing item ID',
+                'event': event
+            })
         
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'message': 'Item deleted successfully',
-                'deleted_item': response['Attributes']
+        # Replace the item with its tombstone
+        try:
+            response = await table.put_item(
+                Item=tombstone(item_id),
+                ConditionExpression='attribute_exists(id) AND attribute_not_exists(deleted)',
+                ReturnValues='ALL_OLD'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return json_response(404, {
+                'error': 'Item not found'
             })
-        }
+        await items_cache.invalidate(ITEMS_CACHE_KEY)
+        
+        return json_response(200, {
+            'message': 'Item deleted successfully',
+            'deleted_item': response['Attributes']
+        })
     
     except Exception as e:
-        error_msg = f"Error: {str(e)}"
-        import traceback
-        error_details = traceback.format_exc()
-        print(error_msg)
-        print(error_details)
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': error_msg,
-                'details': error_details
-            })
-        }
+        return error_response(e, include_details=True)
+
+def handler(event, context):
+    """Lambda entry point (the HTTP server awaits handle directly)."""
+    return run_sync(handle(event, context))
 
+def tombstone(item_id):
+    """The item that marks item_id as deleted."""
+    return {
+        'id': item_id,
+        'deleted': True,
+        'updated_at': datetime.utcnow().isoformat(),
+        'listing': LISTING,
+        'expires_at': int(time.time()) + TOMBSTONE_TTL_DAYS * 86400
+    }
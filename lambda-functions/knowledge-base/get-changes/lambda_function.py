@@ -0,0 +1,94 @@
+import os
+from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Key
+from change_tokens import issue_token, mark_before, read_token
+from data_access import get_table, run_sync
+from http_responses import error_response, json_response
+from log import get_logger
+from metrics import instrumented
+from tracing import traced
+
+logger = get_logger(__name__)
+
+# DynamoDB table (sync boto3 on Lambda, aiobotocore in server mode)
+TABLE_NAME = os.environ.get('TABLE_NAME', 'PersonalKnowledgeBase')
+table = get_table(TABLE_NAME)
+
+# Items and tombstones by write time (see create-item and delete-item)
+UPDATED_AT_INDEX = 'UpdatedAtIndex'
+LISTING = 'items'
+
+# Changes per response; clients follow next_token while has_more is set
+PAGE_SIZE = int(os.environ.get('CHANGES_PAGE_SIZE', '500'))
+
+# Tombstones live this long (delete-item): a token older than that may have
+# missed deletions, so its client has to reload GET /items
+TOMBSTONE_TTL_DAYS = int(os.environ.get('TOMBSTONE_TTL_DAYS', '7'))
+
+@instrumented
+@traced
+async def handle(event, context):
+    """
+    Lambda function to get the items changed since a change token
+    """
+    try:
+        # Debug: log the event structure (LOG_LEVEL=DEBUG)
+        logger.debug("Event received: %s", event)
+        
+        query_params = event.get('queryStringParameters') or {}
+        token = query_params.get('since')
+        if not token:
+            return json_response(400, {
+                'error': 'Missing since token (GET /items returns one as sync_token)'
+            })
+        try:
+            mark, resume_key = read_token(token)
+        except ValueError:
+            return json_response(400, {
+                'error': 'Invalid since token'
+            })
+        
+        if datetime.fromisoformat(mark) < datetime.utcnow() - timedelta(days=TOMBSTONE_TTL_DAYS):
+            return json_response(410, {
+                'error': 'Change token expired - reload GET /items',
+                'reset': True
+            })
+        
+        started = datetime.utcnow()
+        query_kwargs = {
+            'IndexName': UPDATED_AT_INDEX,
+            'KeyConditionExpression': Key('listing').eq(LISTING) & Key('updated_at').gt(mark),
+            'Limit': PAGE_SIZE
+        }
+        if resume_key:
+            query_kwargs['ExclusiveStartKey'] = resume_key
+        response = await table.query(**query_kwargs)
+        changes = [change(item) for item in response['Items']]
+        
+        # More to read: continue this sync where the Query stopped.
+        # Done: the next sync starts from now (never from before this one).
+        has_more = 'LastEvaluatedKey' in response
+        if has_more:
+            next_token = issue_token(mark, response['LastEvaluatedKey'])
+        else:
+            next_token = issue_token(max(mark, mark_before(started)))
+        
+        return json_response(200, {
+            'changes': changes,
+            'count': len(changes),
+            'next_token': next_token,
+            'has_more': has_more
+        })
+    
+    except Exception as e:
+        return error_response(e, include_details=True)
+
+def handler(event, context):
+    """Lambda entry point (the HTTP server awaits handle directly)."""
+    return run_sync(handle(event, context))
+
+def change(item):
+    """An item as returned, or the tombstone {id, deleted, updated_at} of a deleted one."""
+    if item.get('deleted'):
+        return {'id': item['id'], 'deleted': True, 'updated_at': item['updated_at']}
+    return item
@@ -1,58 +1,136 @@
-import json
-import boto3
 import os
-from decimal import Decimal
+import time
+from datetime import datetime
+from boto3.dynamodb.conditions import Attr, Key
+from cache import get_cache
+from change_tokens import issue_token, mark_before
+from data_access import get_table, run_sync
+from http_responses import CORS_HEADERS, dumps, error_response
+from log import get_logger
+from metrics import instrumented
+from snapshots import read_snapshot
+from tracing import traced
 
-# DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+logger = get_logger(__name__)
+
+# DynamoDB table (sync boto3 on Lambda, aiobotocore in server mode)
 TABLE_NAME = os.environ.get('TABLE_NAME', 'PersonalKnowledgeBase')
-table = dynamodb.Table(TABLE_NAME)
+table = get_table(TABLE_NAME)
 
-def handler(event, context):
+# Read-through cache of the listing (CACHE_BACKEND); concurrent misses share
+# one Scan, and create-item and delete-item invalidate the same key
+items_cache = get_cache('items')
+ITEMS_CACHE_KEY = f"items:{TABLE_NAME}"
+ITEMS_CACHE_TTL = int(os.environ.get('ITEMS_CACHE_TTL', '30'))
+
+# Snapshot of the listing written by snapshot-items (s3://bucket/key or
+# file:///path). With one, the listing is the snapshot plus a Query of the
+# items written since its high-water mark; without one - or if it is older
+# than ITEMS_SNAPSHOT_MAX_AGE seconds - the table is scanned.
+SNAPSHOT_URL = os.environ.get('ITEMS_SNAPSHOT_URL')
+SNAPSHOT_MAX_AGE = int(os.environ.get('ITEMS_SNAPSHOT_MAX_AGE', '86400'))
+SNAPSHOT_RELOAD_SECONDS = int(os.environ.get('ITEMS_SNAPSHOT_RELOAD', '60'))
+
+# Writes since the snapshot: partition listing=items, sorted by updated_at
+UPDATED_AT_INDEX = 'UpdatedAtIndex'
+LISTING = 'items'
+
+snapshot_state = {'document': None, 'items': None, 'loaded_at': None}  # per container
+
+@instrumented
+@traced
+async def handle(event, context):
     """
     Lambda function to get all items from DynamoDB
     """
     try:
-        # Debug: log the event structure
-        print(f"Event received: {json.dumps(event)}")
-        
-        # Scan table to get all items
-        response = table.scan()
+        # Debug: log the event structure (LOG_LEVEL=DEBUG)
+        logger.debug("Event received: %s", event)
         
-        # Convert Decimal to string for JSON serialization
-        items = response.get('Items', [])
-        for item in items:
-            for key, value in item.items():
-                if isinstance(value, Decimal):
-                    item[key] = float(value)
-        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'items': items,
-                'count': len(items)
-            })
-        }
+        body = await items_cache.get_or_load(ITEMS_CACHE_KEY, ITEMS_CACHE_TTL, list_items)
+        return {'statusCode': 200, 'headers': dict(CORS_HEADERS), 'body': body}
     
     except Exception as e:
-        error_msg = f"Error: {str(e)}"
-        import traceback
-        error_details = traceback.format_exc()
-        print(error_msg)
-        print(error_details)
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'error': error_msg,
-                'details': error_details
-            })
-        }
+        return error_response(e, include_details=True)
+
+async def list_items():
+    """Build the listing and return the response body."""
+    started = datetime.utcnow()
+    snapshot = await current_snapshot()
+    if snapshot is not None:
+        items = merge_changes(snapshot, await changed_since(snapshot['high_water']))
+    else:
+        items = await scan_items()
+    
+    # Decimals are converted by the shared JSON encoder. With sync_token,
+    # clients keeping a copy fetch only GET /items/changes from now on.
+    return dumps({
+        'items': items,
+        'count': len(items),
+        'sync_token': issue_token(mark_before(started))
+    })
+
+def handler(event, context):
+    """Lambda entry point (the HTTP server awaits handle directly)."""
+    return run_sync(handle(event, context))
+
+async def scan_items():
+    """Scan every page of the table (tombstones aside)."""
+    items = []
+    scan_kwargs = {'FilterExpression': Attr('deleted').not_exists()}
+    while True:
+        response = await table.scan(**scan_kwargs)
+        items.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return items
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+async def current_snapshot():
+    """The snapshot's items by id, re-read every SNAPSHOT_RELOAD_SECONDS; None to scan."""
+    if not SNAPSHOT_URL:
+        return None
+    now = time.monotonic()
+    if snapshot_state['loaded_at'] is None or now - snapshot_state['loaded_at'] >= SNAPSHOT_RELOAD_SECONDS:
+        try:
+            document = await read_snapshot(SNAPSHOT_URL)
+        except Exception as e:
+            # Keep serving the copy in memory (the age check below still applies)
+            logger.warning("Snapshot read failed: %s", e)
+        else:
+            snapshot_state['document'] = document
+            snapshot_state['items'] = {item['id']: item for item in document['items']} if document else None
+        snapshot_state['loaded_at'] = now
+    
+    document = snapshot_state['document']
+    if document is None:
+        return None
+    age = (datetime.utcnow() - datetime.fromisoformat(document['taken_at'])).total_seconds()
+    if age > SNAPSHOT_MAX_AGE:
+        logger.warning("Snapshot from %s is too old - scanning", document['taken_at'])
+        return None
+    return {'high_water': document['high_water'], 'items': snapshot_state['items']}
+
+async def changed_since(high_water):
+    """Items and tombstones written after the high-water mark, oldest first."""
+    changes = []
+    query_kwargs = {
+        'IndexName': UPDATED_AT_INDEX,
+        'KeyConditionExpression': Key('listing').eq(LISTING) & Key('updated_at').gt(high_water)
+    }
+    while True:
+        response = await table.query(**query_kwargs)
+        changes.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return changes
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
 
+def merge_changes(snapshot, changes):
+    """The snapshot's items with the changes applied (snapshot order, new items last)."""
+    items = dict(snapshot['items'])
+    for item in changes:
+        if item.get('deleted'):
+            items.pop(item['id'], None)
+        else:
+            items[item['id']] = item
+    return list(items.values())
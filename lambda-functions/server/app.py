@@ -0,0 +1,351 @@
+"""
+Long-running HTTP server for the Lambda handlers (kubernetes, local runs).
+
+Mounts the API handlers as plain HTTP routes on one ASGI app:
+
+    GET    /items           knowledge-base/get-items
+    GET    /items/changes   knowledge-base/get-changes
+    POST   /items           knowledge-base/create-item
+    DELETE /items/{id}      knowledge-base/delete-item
+    POST   /transactions    budget-tracker/add-transaction
+    GET    /balance         budget-tracker/get-balance
+    POST   /alerts          budget-tracker/send-alert
+
+Each request becomes an API Gateway proxy event for the unchanged handler, so
+the same code runs here and on Lambda. The Lambda invoke path
+(POST /2015-03-31/functions/<name>/invocations with the event as the body)
+is served too, so clients of the runtime-emulator images keep working.
+
+    PYTHONPATH=lambda-functions/shared python lambda-functions/server/app.py
+
+Handlers written as coroutines (handle) are awaited on the event loop, with
+DynamoDB calls through aiobotocore (shared/data_access); the others run on
+SERVER_THREADS threads. SERVER_WORKERS processes share the port.
+GET /metrics exposes Prometheus metrics (see prometheus.py), GET /healthz and
+GET /readyz answer the kubernetes probes (see health.py).
+"""
+import asyncio
+import base64
+import contextvars
+import importlib.util
+import inspect
+import json
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+import data_access
+import health
+import prometheus
+from aws_clients import close_async_clients
+from cache import close_cache
+from http_responses import CORS_HEADERS, json_response
+from log import get_logger
+
+logger = get_logger(__name__)
+
+HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', '8080'))
+WORKERS = int(os.environ.get('SERVER_WORKERS', '1'))
+THREADS = int(os.environ.get('SERVER_THREADS', '16'))
+ASYNC_IO = os.environ.get('SERVER_ASYNC_IO', 'true').lower() == 'true'
+
+# Handler code lives next to this directory (lambda-functions/ or /app in the image)
+HANDLERS_ROOT = os.environ.get('HANDLERS_ROOT') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# TABLE_NAME each application's handlers are imported with
+TABLES = {
+    'knowledge-base': os.environ.get('KNOWLEDGE_BASE_TABLE', 'PersonalKnowledgeBase'),
+    'budget-tracker': os.environ.get('BUDGET_TABLE', 'BudgetTracker')
+}
+
+# (method, resource, function directory, Lambda function name)
+ROUTES = [
+    ('GET', '/items', 'knowledge-base/get-items', 'pkb-api-get-items'),
+    # Ahead of /items/{id}: the first route matching path and method wins
+    ('GET', '/items/changes', 'knowledge-base/get-changes', 'pkb-api-get-changes'),
+    ('POST', '/items', 'knowledge-base/create-item', 'pkb-api-create-item'),
+    ('DELETE', '/items/{id}', 'knowledge-base/delete-item', 'pkb-api-delete-item'),
+    ('POST', '/transactions', 'budget-tracker/add-transaction', 'budget-tracker-add-transaction'),
+    ('GET', '/balance', 'budget-tracker/get-balance', 'budget-tracker-get-balance'),
+    ('POST', '/alerts', 'budget-tracker/send-alert', 'budget-tracker-send-alert'),
+]
+
+INVOKE_PATH = re.compile(r'^/2015-03-31/functions/(?P<function>[^/]+)/invocations/?$')
+
+CORS_PREFLIGHT_HEADERS = {
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,X-Account-Id',
+    'Access-Control-Max-Age': '600'
+}
+
+
+def resource_pattern(resource):
+    """'/items/{id}' -> regex matching '/items/abc' (also under a stage prefix)."""
+    pattern = re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', resource)
+    return re.compile(f"{pattern}/?$")
+
+
+def load_handler(function_dir):
+    """Import a handler module under its own name, with its TABLE_NAME set."""
+    module_name = function_dir.replace('/', '.').replace('-', '_')
+    path = os.path.join(HANDLERS_ROOT, function_dir, 'lambda_function.py')
+    saved = os.environ.get('TABLE_NAME')
+    os.environ['TABLE_NAME'] = TABLES[function_dir.split('/')[0]]
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        if saved is None:
+            os.environ.pop('TABLE_NAME', None)
+        else:
+            os.environ['TABLE_NAME'] = saved
+    return module
+
+
+class Route:
+    """One mounted handler."""
+
+    def __init__(self, method, resource, function_dir, function_name):
+        self.method = method
+        self.resource = resource
+        self.function_dir = function_dir
+        self.function_name = function_name
+        self.pattern = resource_pattern(resource)
+        module = load_handler(function_dir)
+        self.handler = module.handler
+        # Coroutine handlers are awaited directly once DynamoDB calls are async
+        handle = getattr(module, 'handle', None)
+        self.async_handler = handle if data_access.ASYNC and inspect.iscoroutinefunction(handle) else None
+
+
+class InvocationContext:
+    """The parts of the Lambda context object the handlers use."""
+
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+
+
+class Router:
+    """Matches requests to routes and runs the sync handlers on a thread pool."""
+
+    def __init__(self, routes, threads):
+        self.routes = [Route(*route) for route in routes]
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='handler')
+
+    def match(self, method, path):
+        """Return (route, path parameters), (None, allowed methods) or (None, None)."""
+        allowed = []
+        for route in self.routes:
+            match = route.pattern.search(path)
+            if match:
+                if route.method == method:
+                    return route, match.groupdict() or None
+                allowed.append(route.method)
+        return None, allowed or None
+
+    def by_name(self, name):
+        for route in self.routes:
+            if name in (route.function_name, route.function_dir.split('/')[-1]):
+                return route
+        return None
+
+    async def invoke(self, route, event):
+        """Run the handler like Lambda would: one event, one context."""
+        context = InvocationContext(route.function_name)
+        state = prometheus.start_request(route)
+        status = 500
+        try:
+            if route.async_handler is not None:
+                result = await route.async_handler(event, context)
+            else:
+                # Carry the request's context variables into the worker thread
+                loop = asyncio.get_running_loop()
+                run = contextvars.copy_context().run
+                result = await loop.run_in_executor(self.executor, run, route.handler, event, context)
+            if isinstance(result, dict):
+                status = int(result.get('statusCode', 200))
+            return result
+        finally:
+            prometheus.finish_request(route, state, status)
+
+
+def proxy_event(scope, body, route, path_params):
+    """Build the API Gateway (REST, proxy integration) event for an HTTP request."""
+    headers = {}
+    multi_headers = {}
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        headers[name] = value
+        multi_headers.setdefault(name, []).append(value)
+
+    query = parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True)
+    multi_query = {}
+    for name, value in query:
+        multi_query.setdefault(name, []).append(value)
+
+    try:
+        text, encoded = body.decode('utf-8'), False
+    except UnicodeDecodeError:
+        text, encoded = base64.b64encode(body).decode('ascii'), True
+
+    return {
+        'resource': route.resource,
+        'path': scope['path'],
+        'httpMethod': scope['method'],
+        'headers': headers,
+        'multiValueHeaders': multi_headers,
+        'queryStringParameters': dict(query) or None,
+        'multiValueQueryStringParameters': multi_query or None,
+        'pathParameters': path_params,
+        'body': text if body else None,
+        'isBase64Encoded': encoded,
+        'requestContext': {
+            'resourcePath': route.resource,
+            'httpMethod': scope['method'],
+            'path': scope['path'],
+            'requestId': str(uuid.uuid4()),
+            'stage': 'server'
+        }
+    }
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_response(send, response):
+    """Write a Lambda proxy response ({statusCode, headers, body}) to the client."""
+    body = response.get('body') or ''
+    if response.get('isBase64Encoded'):
+        payload = base64.b64decode(body)
+    else:
+        payload = body.encode('utf-8')
+    headers = [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+               for name, value in (response.get('headers') or {}).items()]
+    headers.append((b'content-length', str(len(payload)).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': int(response.get('statusCode', 200)), 'headers': headers})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def handle_invoke(router, function_name, body):
+    """Lambda invoke API: the event is the body, the handler result the response."""
+    try:
+        event = json.loads(body or b'{}')
+    except ValueError:
+        return json_response(400, {'error': 'Invocation payload is not JSON'})
+
+    route = router.by_name(function_name)
+    path_params = event.get('pathParameters') if isinstance(event, dict) else None
+    if route is None and isinstance(event, dict):
+        # Generic name ('function' in the emulator images): route on the event
+        route, path_params = router.match((event.get('httpMethod') or '').upper(), event.get('path') or event.get('resource') or '')
+        if route is not None:
+            event = dict(event, resource=route.resource, pathParameters=event.get('pathParameters') or path_params)
+    if route is None:
+        return json_response(404, {'error': f"No handler for {function_name}"})
+
+    result = await router.invoke(route, event)
+    return {'statusCode': 200, 'headers': {'Content-Type': 'application/json'}, 'body': json.dumps(result)}
+
+
+async def handle_http(router, scope, body):
+    method = scope['method']
+    route, params = router.match(method, scope['path'])
+    if route is not None:
+        return await router.invoke(route, proxy_event(scope, body, route, params))
+    if params is None:
+        return json_response(404, {'error': f"No route for {scope['path']}"})
+    allowed = ', '.join(sorted(set(params + ['OPTIONS'])))
+    if method == 'OPTIONS':
+        # CORS preflight (API Gateway answers these with a mock integration)
+        return {'statusCode': 204, 'headers': {
+            **CORS_HEADERS, **CORS_PREFLIGHT_HEADERS, 'Access-Control-Allow-Methods': allowed.replace(' ', '')
+        }, 'body': ''}
+    return json_response(405, {'error': f"Method {method} not allowed on {scope['path']}"}, headers={'Allow': allowed})
+
+
+def enable_async_io():
+    """Switch the handlers' DynamoDB calls to aiobotocore, if it is installed."""
+    try:
+        import aiobotocore  # noqa: F401
+    except ImportError:
+        logger.warning("aiobotocore is not installed - handlers run on the thread pool")
+        return
+    data_access.enable_async()
+
+
+def create_app(routes=ROUTES, threads=THREADS):
+    """ASGI application serving the given routes."""
+    router = Router(routes, threads)
+    readiness = health.Readiness({TABLES[route.function_dir.split('/')[0]] for route in router.routes},
+                                 router.executor)
+    tasks = []
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    tasks.append(asyncio.ensure_future(readiness.warm_up()))
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    for task in tasks:
+                        task.cancel()
+                    router.executor.shutdown(wait=True)
+                    await close_async_clients()
+                    await close_cache()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        body = await read_body(receive)
+        invoke = INVOKE_PATH.match(scope['path'])
+        try:
+            if scope['path'] == '/metrics' and scope['method'] == 'GET':
+                response = {'statusCode': 200, 'headers': {'Content-Type': prometheus.CONTENT_TYPE},
+                            'body': prometheus.render()}
+            elif scope['path'] == '/healthz' and scope['method'] == 'GET':
+                response = json_response(200, {'status': 'ok'})
+            elif scope['path'] == '/readyz' and scope['method'] == 'GET':
+                ready, details = await readiness.status()
+                response = json_response(200 if ready else 503, dict(details, status='ready' if ready else 'not ready'))
+            elif invoke and scope['method'] == 'POST':
+                response = await handle_invoke(router, invoke.group('function'), body)
+            else:
+                response = await handle_http(router, scope, body)
+        except Exception as e:
+            # The handlers catch their own errors; this is the server's
+            logger.exception("Request failed: %s", e)
+            response = json_response(500, {'error': str(e)})
+        await send_response(send, response)
+
+    app.router = router
+    app.readiness = readiness
+    return app
+
+
+if ASYNC_IO:
+    enable_async_io()
+app = create_app()
+
+
+def main():
+    import uvicorn
+    uvicorn.run('app:app', host=HOST, port=PORT, workers=WORKERS,
+                app_dir=os.path.dirname(os.path.abspath(__file__)),
+                log_level=os.environ.get('LOG_LEVEL', 'info').lower(), access_log=False)
+
+
+if __name__ == '__main__':
+    main()
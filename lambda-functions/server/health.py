@@ -0,0 +1,88 @@
+"""
+Liveness and readiness for the HTTP server mode (kubernetes probes).
+
+    GET /healthz    200 while the process serves requests at all
+    GET /readyz     200 once the process is warm and DynamoDB answers, else 503
+
+Warm-up starts with the server: the handlers are imported by then, and a
+DescribeTable on every table goes through the client the handlers use, which
+builds it and opens its first connections. Until that succeeds the pod gets no
+traffic. After that, readiness re-checks DynamoDB at most every
+READY_CHECK_INTERVAL seconds; probes in between get the last result.
+"""
+import asyncio
+import contextvars
+import os
+import time
+
+import data_access
+import prometheus
+from log import get_logger
+
+logger = get_logger(__name__)
+
+CHECK_INTERVAL = float(os.environ.get('READY_CHECK_INTERVAL', '10'))
+CHECK_TIMEOUT = float(os.environ.get('READY_CHECK_TIMEOUT', '2'))
+
+
+class Readiness:
+    """DynamoDB connectivity and warm-up state of one server process."""
+
+    def __init__(self, tables, executor):
+        self.tables = sorted(set(tables))
+        self.executor = executor
+        self.warm = False
+        self.error = 'warming up'
+        self.checked_at = None
+        # Created in the event loop, on first use
+        self._lock = None
+
+    async def warm_up(self):
+        """Check until DynamoDB answers once (runs as a task from server startup)."""
+        delay = 0.5
+        while not await self.check():
+            logger.warning("Not ready: %s", self.error)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, CHECK_INTERVAL)
+        logger.info("Ready: DynamoDB tables %s reachable", ', '.join(self.tables))
+
+    async def status(self):
+        """(ready, details) for /readyz, re-checking DynamoDB if the last check is stale."""
+        if self.warm and time.monotonic() - self.checked_at >= CHECK_INTERVAL:
+            await self.check()
+        return self.warm and self.error is None, {
+            'warm': self.warm,
+            'tables': self.tables,
+            'error': self.error
+        }
+
+    async def check(self):
+        """DescribeTable on every table; concurrent callers share one check."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        checked_at = self.checked_at
+        async with self._lock:
+            if self.checked_at != checked_at:
+                return self.error is None
+            token = prometheus.current_function.set('readiness')
+            try:
+                await asyncio.wait_for(asyncio.gather(*(self._describe(name) for name in self.tables)), CHECK_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.error = f"DynamoDB did not answer within {CHECK_TIMEOUT:g} s"
+            except Exception as e:
+                self.error = f"DynamoDB check failed: {e}"
+            else:
+                self.error = None
+                self.warm = True
+            finally:
+                prometheus.current_function.reset(token)
+                self.checked_at = time.monotonic()
+            return self.error is None
+
+    async def _describe(self, name):
+        if data_access.ASYNC:
+            return await data_access.describe_table(name)
+        # boto3 blocks: run the check on the handler threads
+        loop = asyncio.get_running_loop()
+        run = contextvars.copy_context().run
+        return await loop.run_in_executor(self.executor, run, data_access.run_sync, data_access.describe_table(name))
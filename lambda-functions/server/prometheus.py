@@ -0,0 +1,164 @@
+"""
+Prometheus metrics for the HTTP server mode (GET /metrics).
+
+Series use the names grafana/dashboards/lambda-monitoring.json already
+queries, labelled by the Lambda function name of the route, so the same
+dashboard covers Lambda and the kubernetes stack:
+
+    aws_lambda_invocations{functionName}            counter
+    aws_lambda_errors{functionName}                 counter (5xx responses)
+    aws_lambda_duration_ms{functionName}            histogram
+    aws_lambda_in_flight{functionName}              gauge
+    pkb_http_requests{functionName,method,route,status}   counter
+    aws_dynamodb_call_duration_ms{functionName,operation} histogram
+    pkb_cache_lookups{functionName,cache,result}          counter (hit/miss)
+
+Values live in this process: with SERVER_WORKERS > 1 each scrape sees one
+worker, so run one worker per pod and scale pods instead.
+"""
+import contextvars
+import threading
+import time
+
+from metrics import observe_cache_lookups, observe_dynamodb_calls
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Milliseconds; handlers on a 3 s Lambda timeout, DynamoDB calls mostly < 50 ms
+DURATION_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+DYNAMODB_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Function name of the request being handled (DynamoDB calls are labelled with it)
+current_function = contextvars.ContextVar('prometheus_function', default='unknown')
+
+
+class Metric:
+    """One metric family: label values -> value, guarded by a lock.
+
+    Synchronous handlers run on the server's thread pool, so updates can
+    come from several threads at once.
+    """
+
+    def __init__(self, name, kind, help_text, labels):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in sorted(items):
+            yield self.name, key, value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{format_labels(key)} {format_value(value)}")
+        return lines
+
+    def _key(self, labels):
+        return tuple((name, str(labels[name])) for name in self.labels)
+
+
+class Histogram(Metric):
+    """Cumulative buckets plus _sum and _count per label set."""
+
+    def __init__(self, name, help_text, labels, buckets):
+        super().__init__(name, 'histogram', help_text, labels)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-1] += 1
+            self.values[key] = (counts, total + value)
+
+    def samples(self):
+        with self.lock:
+            items = [(key, (list(counts), total)) for key, (counts, total) in self.values.items()]
+        for key, (counts, total) in sorted(items):
+            for bound, count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket", key + (('le', format_value(bound)),), count
+            yield f"{self.name}_bucket", key + (('le', '+Inf'),), counts[-1]
+            yield f"{self.name}_sum", key, total
+            yield f"{self.name}_count", key, counts[-1]
+
+
+def format_labels(key):
+    if not key:
+        return ''
+    escaped = (value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"') for _, value in key)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+INVOCATIONS = Metric('aws_lambda_invocations', 'counter', 'Handler invocations', ['functionName'])
+ERRORS = Metric('aws_lambda_errors', 'counter', 'Invocations that failed or returned 5xx', ['functionName'])
+DURATION = Histogram('aws_lambda_duration_ms', 'Handler duration in milliseconds', ['functionName'], DURATION_BUCKETS)
+IN_FLIGHT = Metric('aws_lambda_in_flight', 'gauge', 'Invocations in progress', ['functionName'])
+REQUESTS = Metric('pkb_http_requests', 'counter', 'HTTP requests by route and status',
+                  ['functionName', 'method', 'route', 'status'])
+DYNAMODB_DURATION = Histogram('aws_dynamodb_call_duration_ms', 'DynamoDB call latency in milliseconds',
+                              ['functionName', 'operation'], DYNAMODB_BUCKETS)
+CACHE_LOOKUPS = Metric('pkb_cache_lookups', 'counter', 'Read-through cache lookups by result',
+                       ['functionName', 'cache', 'result'])
+
+REGISTRY = [INVOCATIONS, ERRORS, DURATION, IN_FLIGHT, REQUESTS, DYNAMODB_DURATION, CACHE_LOOKUPS]
+
+
+def start_request(route):
+    """Count a request in flight; returns the state finish_request needs."""
+    IN_FLIGHT.inc(functionName=route.function_name)
+    return current_function.set(route.function_name), time.perf_counter()
+
+
+def finish_request(route, state, status):
+    """Record a finished request with its HTTP status (500 if the handler raised)."""
+    token, started = state
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    current_function.reset(token)
+    function_name = route.function_name
+    IN_FLIGHT.dec(functionName=function_name)
+    INVOCATIONS.inc(functionName=function_name)
+    DURATION.observe(elapsed_ms, functionName=function_name)
+    REQUESTS.inc(functionName=function_name, method=route.method, route=route.resource, status=status)
+    if status >= 500:
+        ERRORS.inc(functionName=function_name)
+
+
+def record_dynamodb_call(operation, latency_ms):
+    DYNAMODB_DURATION.observe(latency_ms, functionName=current_function.get(), operation=operation)
+
+
+def record_cache_lookup(cache_name, hit):
+    CACHE_LOOKUPS.inc(functionName=current_function.get(), cache=cache_name, result='hit' if hit else 'miss')
+
+
+def render():
+    """The registry in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+observe_dynamodb_calls(record_dynamodb_call)
+observe_cache_lookups(record_cache_lookup)
@@ -0,0 +1,133 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+from metrics import instrument_dynamodb
+from tracing import instrument_client
+
+# Shared boto3 clients/resources for every handler.
+#
+# Each service is built once per container, on first use, with explicit
+# pooling, keepalive, timeouts and adaptive retries instead of botocore's
+# defaults (60 s timeouts, legacy retries). A call can take up to
+# (connect + read timeout) x max attempts, which has to fit the function
+# timeout with room to spare:
+#
+#   knowledge-base functions (3 s):  (0.5 + 0.75) x 2 = 2.5 s - the defaults
+#   budget tracker functions (10 s): (0.5 + 2) x 3 = 7.5 s - AWS_READ_TIMEOUT=2,
+#                                    AWS_MAX_ATTEMPTS=3 in their environment
+#   imports and snapshots (120 s):   (0.5 + 5) x 3 = 16.5 s - AWS_READ_TIMEOUT=5
+CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', '0.5'))
+READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', '0.75'))
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '10'))
+MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '2'))
+
+# Async clients (server mode) multiplex many in-flight requests over one pool
+ASYNC_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_ASYNC_MAX_POOL_CONNECTIONS', '100'))
+
+_clients = {}
+_resources = {}
+_tables = {}
+# boto3's default session is not thread-safe: building two clients at once
+# can fail (KeyError: 'credential_provider'), so creation is serialized
+_lock = threading.RLock()
+
+
+def config_settings(**overrides):
+    """The shared client settings as Config keyword arguments."""
+    settings = {
+        'connect_timeout': CONNECT_TIMEOUT,
+        'read_timeout': READ_TIMEOUT,
+        'max_pool_connections': MAX_POOL_CONNECTIONS,
+        'tcp_keepalive': True,
+        'retries': {'mode': 'adaptive', 'max_attempts': MAX_ATTEMPTS},
+    }
+    settings.update(overrides)
+    return settings
+
+
+def client_config(**overrides):
+    """Return the shared botocore Config, optionally with overrides."""
+    return Config(**config_settings(**overrides))
+
+
+def get_client(service, **overrides):
+    """Return a cached boto3 client for the service.
+
+    Clients built with overrides (e.g. a tighter timeout) are cached
+    separately from the default one.
+    """
+    key = (service, tuple(sorted((name, repr(value)) for name, value in overrides.items())))
+    if key not in _clients:
+        with _lock:
+            if key not in _clients:
+                client = boto3.client(service, config=client_config(**overrides))
+                instrument_client(client)
+                if service == 'dynamodb':
+                    instrument_dynamodb(client)
+                _clients[key] = client
+    return _clients[key]
+
+
+def get_resource(service):
+    """Return a cached boto3 resource for the service."""
+    if service not in _resources:
+        with _lock:
+            if service not in _resources:
+                resource = boto3.resource(service, config=client_config())
+                instrument_client(resource.meta.client)
+                if service == 'dynamodb':
+                    instrument_dynamodb(resource.meta.client)
+                _resources[service] = resource
+    return _resources[service]
+
+
+def get_table(name):
+    """Return a cached DynamoDB Table."""
+    if name not in _tables:
+        with _lock:
+            if name not in _tables:
+                _tables[name] = get_resource('dynamodb').Table(name)
+    return _tables[name]
+
+
+_async_clients = {}
+_async_lock = None
+
+
+async def get_async_client(service):
+    """Return a cached aiobotocore client for the service (HTTP server mode).
+
+    The client is opened on first use in the running event loop and stays
+    open, so every request in the process shares its connection pool; call
+    close_async_clients() on shutdown. Only the server imports aiobotocore.
+    """
+    global _async_lock
+    if service in _async_clients:
+        return _async_clients[service][1]
+
+    import asyncio
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+
+    if _async_lock is None:
+        _async_lock = asyncio.Lock()
+    async with _async_lock:
+        if service not in _async_clients:
+            config = AioConfig(**config_settings(max_pool_connections=ASYNC_MAX_POOL_CONNECTIONS))
+            context = get_session().create_client(service, config=config)
+            client = await context.__aenter__()
+            instrument_client(client)
+            if service == 'dynamodb':
+                instrument_dynamodb(client)
+            _async_clients[service] = (context, client)
+    return _async_clients[service][1]
+
+
+async def close_async_clients():
+    """Close the async clients and their connection pools."""
+    while _async_clients:
+        _, (context, _) = _async_clients.popitem()
+        await context.__aexit__(None, None, None)
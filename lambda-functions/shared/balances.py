@@ -0,0 +1,84 @@
+import os
+import random
+import re
+from decimal import Decimal, ROUND_HALF_UP
+
+from data_access import batch_get_item, sleep
+
+# Account ids and balance shards, shared by the budget tracker functions.
+#
+# Budgets are scoped per account; requests without one use the default
+# account. Account balances are write-sharded so bursts of transactions do
+# not serialize on one item: shard 0 keeps the balance#<account_id> key and
+# records shard_count, shard n > 0 is balance#<account_id>#<n>. Writers grow
+# the count (add-transaction), readers sum every shard.
+DEFAULT_ACCOUNT_ID = os.environ.get('DEFAULT_ACCOUNT_ID', 'default')
+ACCOUNT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+MAX_BALANCE_SHARDS = int(os.environ.get('MAX_BALANCE_SHARDS', '16'))
+
+# BatchGetItem rounds for keys DynamoDB left unprocessed (throttling)
+MAX_RETRIES = 5
+
+shard_counts = {}  # account_id -> last known shard_count (per container)
+
+
+def to_minor(value):
+    """Convert a major-unit amount (e.g. dollars) to integer minor units (cents)."""
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def account_id_from(event, body=None):
+    """Read the account id from the X-Account-Id header, query string or body.
+
+    Returns None if the id is not a valid account id.
+    """
+    headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+    query = event.get('queryStringParameters') or {}
+    account_id = (
+        headers.get('x-account-id')
+        or query.get('account_id')
+        or (body or {}).get('account_id')
+        or DEFAULT_ACCOUNT_ID
+    )
+    return account_id if ACCOUNT_ID_PATTERN.match(account_id) else None
+
+
+def shard_key(account_id, shard):
+    """Key of one balance shard item."""
+    return {'id': f"balance#{account_id}" if shard == 0 else f"balance#{account_id}#{shard}"}
+
+
+async def read_balance(table, account_id):
+    """Sum every balance shard with BatchGetItem; returns (balance_minor, txn_count)."""
+    count = shard_counts.get(account_id, 1)
+    shards = await fetch_shards(table, account_id, range(count))
+    actual = int(shards.get(0, {}).get('shard_count', 1))
+    if actual > count:
+        # Shards were added since this container last looked
+        shards.update(await fetch_shards(table, account_id, range(count, actual)))
+    shard_counts[account_id] = max(count, actual)
+
+    balance_minor = sum(int(item.get('balance_minor', 0)) for item in shards.values())
+    txn_count = sum(int(item.get('txn_count', 0)) for item in shards.values())
+    return balance_minor, txn_count
+
+
+async def fetch_shards(table, account_id, shards):
+    """BatchGetItem the given shard numbers; returns {shard: item}.
+
+    Reads are strongly consistent: add-transaction sums the shards right
+    after writing one of them, and must see its own write.
+    """
+    keys = {shard_key(account_id, shard)['id']: shard for shard in shards}
+    found = {}
+    request = {table.name: {'Keys': [{'id': key} for key in keys], 'ConsistentRead': True}}
+    for attempt in range(MAX_RETRIES):
+        response = await batch_get_item(RequestItems=request)
+        for item in response['Responses'].get(table.name, []):
+            found[keys[item['id']]] = item
+        request = response.get('UnprocessedKeys')
+        if not request:
+            return found
+        # Exponential backoff with full jitter before asking for the rest
+        await sleep(random.uniform(0, 0.05 * 2 ** attempt))
+    raise RuntimeError('BatchGetItem left unprocessed balance shards after retries')
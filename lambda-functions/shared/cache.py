@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import data_access
+from coalesce import coalesced, forget
+from log import get_logger
+from metrics import record_cache_lookup
+
+logger = get_logger(__name__)
+
+# Read-through cache for hot handler responses (get-items, get-balance).
+#
+# CACHE_BACKEND picks the store:
+#   none    - off (default): nothing is stored
+#   memory  - LRU of CACHE_MAX_ENTRIES per container / server process
+#   redis   - shared Redis-compatible server at CACHE_REDIS_URL
+#
+# Values are response body strings with a TTL. A miss is loaded once for all
+# concurrent readers of the key (see coalesce), with or without a store.
+# Writers invalidate the keys they change, but only in their own process with
+# the memory backend - on Lambda, or with several pods, use Redis or keep
+# TTLs short. A cache that cannot be reached counts as a miss: requests never
+# fail because of it, and after an error it is left alone for
+# CACHE_RETRY_AFTER seconds so an outage does not add a connect timeout to
+# every request.
+BACKEND = os.environ.get('CACHE_BACKEND', 'none').lower()
+MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '512'))
+REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+REDIS_TIMEOUT = float(os.environ.get('CACHE_REDIS_TIMEOUT', '0.2'))
+KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'pkb:')
+RETRY_AFTER = float(os.environ.get('CACHE_RETRY_AFTER', '5'))
+
+_backend = None
+_down_until = 0.0
+_caches = {}
+
+
+class Cache:
+    """One named group of keys (the name labels the hit/miss metrics)."""
+
+    def __init__(self, name):
+        self.name = name
+
+    async def get(self, key):
+        """The cached value, or None on a miss."""
+        backend = available_backend()
+        if backend is None:
+            return None
+        try:
+            value = await backend.get(KEY_PREFIX + key)
+        except Exception as e:
+            backend_failed(f"Cache read failed ({self.name})", e)
+            value = None
+        record_cache_lookup(self.name, value is not None)
+        return value
+
+    async def get_or_load(self, key, ttl, load):
+        """The cached value, else the result of load() - cached for ttl seconds."""
+        value = await self.get(key)
+        if value is not None:
+            return value
+        return await coalesced(self._flight_key(key), lambda: self._load(key, ttl, load))
+
+    async def _load(self, key, ttl, load):
+        value = await load()
+        await self.set(key, value, ttl)
+        return value
+
+    def _flight_key(self, key):
+        return f"{self.name}:{key}"
+
+    async def set(self, key, value, ttl):
+        """Store a string value for ttl seconds."""
+        backend = available_backend()
+        if backend is None or ttl <= 0:
+            return
+        try:
+            await backend.set(KEY_PREFIX + key, value, ttl)
+        except Exception as e:
+            backend_failed(f"Cache write failed ({self.name})", e)
+
+    async def invalidate(self, *keys):
+        """Drop keys after a write changed what they hold."""
+        for key in keys:
+            forget(self._flight_key(key))
+        backend = available_backend()
+        if backend is None:
+            # Off or down: entries live until their TTL runs out
+            return
+        try:
+            await backend.delete([KEY_PREFIX + key for key in keys])
+        except Exception as e:
+            backend_failed(f"Cache invalidation failed ({self.name})", e)
+
+
+def get_cache(name):
+    """Return the Cache for a name."""
+    if name not in _caches:
+        _caches[name] = Cache(name)
+    return _caches[name]
+
+
+def get_backend():
+    """The configured backend, built on first use (None when caching is off)."""
+    global _backend
+    if _backend is None and BACKEND != 'none':
+        if BACKEND == 'memory':
+            _backend = MemoryBackend(MAX_ENTRIES)
+        elif BACKEND == 'redis':
+            _backend = RedisBackend(REDIS_URL)
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND: {BACKEND}")
+    return _backend
+
+
+def available_backend():
+    """The backend, unless caching is off or the backend failed moments ago."""
+    backend = get_backend()
+    if backend is None or time.monotonic() < _down_until:
+        return None
+    return backend
+
+
+def backend_failed(message, error):
+    global _down_until
+    _down_until = time.monotonic() + RETRY_AFTER
+    logger.warning("%s: %s - cache bypassed for %g s", message, error, RETRY_AFTER)
+
+
+async def close_cache():
+    """Close the backend's connections (HTTP server shutdown)."""
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+class MemoryBackend:
+    """Least-recently-used entries with expiry times, shared by the process's threads."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    async def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    async def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    async def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """Redis (or a compatible server) via redis-py: blocking on Lambda, asyncio in server mode."""
+
+    def __init__(self, url):
+        self.url = url
+        self.client = None
+
+    def _client(self):
+        if self.client is None:
+            # Only installed where CACHE_BACKEND=redis (requirements-cache.txt)
+            if data_access.ASYNC:
+                from redis.asyncio import Redis
+            else:
+                from redis import Redis
+            self.client = Redis.from_url(self.url, socket_timeout=REDIS_TIMEOUT,
+                                         socket_connect_timeout=REDIS_TIMEOUT, decode_responses=True)
+        return self.client
+
+    async def get(self, key):
+        return await self._run(self._client().get(key))
+
+    async def set(self, key, value, ttl):
+        await self._run(self._client().set(key, value, ex=max(int(ttl), 1)))
+
+    async def delete(self, keys):
+        await self._run(self._client().delete(*keys))
+
+    async def close(self):
+        if self.client is not None:
+            await self._run(self.client.aclose() if data_access.ASYNC else self.client.close())
+            self.client = None
+
+    async def _run(self, result):
+        # The asyncio client returns awaitables, the blocking one results
+        return await result if data_access.ASYNC else result
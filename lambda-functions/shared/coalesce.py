@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import data_access
+
+# Single-flight loads: concurrent callers asking for the same key share one
+# backend fetch and all get its result (or its exception), so a burst of
+# identical reads costs one Scan instead of one per request.
+#
+# In server mode the callers are coroutines on one event loop and wait on a
+# shared task; on the server's thread pool they are threads waiting on an
+# event. Lambda runs one request per container at a time, so there the load
+# simply runs. Only concurrent callers share: the next call after a load
+# finishes starts a new one.
+
+_tasks = {}
+_flights = {}
+_lock = threading.Lock()
+
+
+async def coalesced(key, load):
+    """Await load() once for every concurrent caller with the same key."""
+    if data_access.ASYNC:
+        return await _shared_task(key, load)
+    return await _shared_flight(key, load)
+
+
+def forget(key):
+    """Detach a load in progress: later callers start a fresh one.
+
+    Writers call this (through cache invalidation) so readers arriving after
+    a write never get a result fetched before it.
+    """
+    _tasks.pop(key, None)
+    with _lock:
+        _flights.pop(key, None)
+
+
+async def _shared_task(key, load):
+    task = _tasks.get(key)
+    if task is None:
+        # A task of its own, so a caller going away does not cancel the others
+        task = asyncio.ensure_future(load())
+        _tasks[key] = task
+        task.add_done_callback(lambda done: _tasks.pop(key) if _tasks.get(key) is done else None)
+    return await asyncio.shield(task)
+
+
+class _Flight:
+    """One load shared by threads."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def _shared_flight(key, load):
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        # Synchronous backend: the coroutine runs on its own thread and may block
+        flight.done.wait()
+        return flight.outcome()
+    try:
+        flight.result = await load()
+    except Exception as e:
+        flight.error = e
+    finally:
+        with _lock:
+            if _flights.get(key) is flight:
+                del _flights[key]
+        flight.done.set()
+    return flight.outcome()
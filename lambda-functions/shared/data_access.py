@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import aws_clients
+
+# DynamoDB access for the handlers, synchronous on Lambda and asyncio in the
+# HTTP server mode.
+#
+# Handlers are coroutines that await the Table methods below. On Lambda the
+# calls go to the boto3 Table synchronously, so the coroutine never suspends
+# and run_sync() finishes it without an event loop. After enable_async() (the
+# server, before it imports the handlers) the same calls go through one
+# aiobotocore client per process, and a request waiting on DynamoDB no longer
+# holds a thread. Items use the boto3 resource types in both modes (Python
+# values in, Decimals out), via boto3's own transformation hooks.
+ASYNC = False
+
+_tables = {}
+_transforms_registered = set()
+
+
+def enable_async():
+    """Route DynamoDB calls through aiobotocore (HTTP server mode only)."""
+    global ASYNC
+    ASYNC = True
+
+
+def run_sync(coroutine):
+    """Run a handler coroutine on the synchronous backend to completion."""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    coroutine.close()
+    raise RuntimeError("Handler awaited asynchronous I/O outside the server's event loop")
+
+
+async def sleep(seconds):
+    """Back off without blocking the event loop in server mode."""
+    if ASYNC:
+        await asyncio.sleep(seconds)
+    else:
+        time.sleep(seconds)
+
+
+async def run_blocking(function, *args, **kwargs):
+    """Call a blocking function (a boto3 client call) without stalling the event loop.
+
+    On Lambda the call simply runs; in server mode it runs on the loop's
+    default thread pool while other requests proceed.
+    """
+    if not ASYNC:
+        return function(*args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(None, lambda: function(*args, **kwargs))
+
+
+def get_table(name):
+    """Return the cached Table for a DynamoDB table name."""
+    if name not in _tables:
+        _tables[name] = Table(name)
+    return _tables[name]
+
+
+class Table:
+    """The boto3 Table operations the handlers use, awaitable in both modes."""
+
+    def __init__(self, name):
+        self.name = name
+
+    async def get_item(self, **kwargs):
+        return await self._call('get_item', kwargs)
+
+    async def put_item(self, **kwargs):
+        return await self._call('put_item', kwargs)
+
+    async def update_item(self, **kwargs):
+        return await self._call('update_item', kwargs)
+
+    async def delete_item(self, **kwargs):
+        return await self._call('delete_item', kwargs)
+
+    async def query(self, **kwargs):
+        return await self._call('query', kwargs)
+
+    async def scan(self, **kwargs):
+        return await self._call('scan', kwargs)
+
+    async def _call(self, operation, kwargs):
+        if not ASYNC:
+            return getattr(aws_clients.get_table(self.name), operation)(**kwargs)
+        client = await dynamodb_client()
+        return await getattr(client, operation)(TableName=self.name, **kwargs)
+
+
+async def batch_get_item(**kwargs):
+    """BatchGetItem with resource types (RequestItems keyed by table name)."""
+    if not ASYNC:
+        return aws_clients.get_resource('dynamodb').batch_get_item(**kwargs)
+    client = await dynamodb_client()
+    return await client.batch_get_item(**kwargs)
+
+
+async def transact_write_items(**kwargs):
+    """TransactWriteItems with resource types (TableName in every action)."""
+    if not ASYNC:
+        return aws_clients.get_resource('dynamodb').meta.client.transact_write_items(**kwargs)
+    client = await dynamodb_client()
+    return await client.transact_write_items(**kwargs)
+
+
+async def describe_table(name):
+    """DescribeTable through the handlers' own client (server readiness checks)."""
+    if not ASYNC:
+        return aws_clients.get_table(name).meta.client.describe_table(TableName=name)
+    client = await dynamodb_client()
+    return await client.describe_table(TableName=name)
+
+
+async def dynamodb_client():
+    """The shared async DynamoDB client, speaking resource types like boto3 Table."""
+    client = await aws_clients.get_async_client('dynamodb')
+    if id(client) not in _transforms_registered:
+        # The same hooks boto3 installs for dynamodb.Table: condition objects
+        # (Key('account_id').eq(...)) and plain Python values in, Python values out
+        from boto3.dynamodb.transform import TransformationInjector, copy_dynamodb_params
+        injector = TransformationInjector()
+        events = client.meta.events
+        events.register('provide-client-params.dynamodb', copy_dynamodb_params,
+                        unique_id='dynamodb-create-params-copy')
+        events.register('before-parameter-build.dynamodb', injector.inject_condition_expressions,
+                        unique_id='dynamodb-condition-expression')
+        events.register('before-parameter-build.dynamodb', injector.inject_attribute_value_input,
+                        unique_id='dynamodb-attr-value-input')
+        events.register('after-call.dynamodb', injector.inject_attribute_value_output,
+                        unique_id='dynamodb-attr-value-output')
+        _transforms_registered.add(id(client))
+    return client
@@ -0,0 +1,69 @@
+import json
+import time
+from decimal import Decimal
+
+from log import get_logger
+from metrics import record_response
+from tracing import span
+
+logger = get_logger(__name__)
+
+# Every API response allows any origin and returns JSON
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Content-Type': 'application/json'
+}
+
+
+class DecimalEncoder(json.JSONEncoder):
+    """JSON encoder for the Decimal numbers DynamoDB returns."""
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return int(o) if o == o.to_integral_value() else float(o)
+        return super().default(o)
+
+
+def dumps(value):
+    """Serialize a response body, converting DynamoDB Decimals."""
+    started = time.perf_counter()
+    with span('serialize-response'):
+        body = json.dumps(value, cls=DecimalEncoder)
+    record_response((time.perf_counter() - started) * 1000, len(body.encode('utf-8')))
+    return body
+
+
+def request_body(event):
+    """Parse the JSON request body (a string from API Gateway, or already a dict)."""
+    with span('parse-body'):
+        body = event.get('body') or '{}'
+        return json.loads(body) if isinstance(body, str) else body
+
+
+def json_response(status_code, body, headers=None):
+    """Build an API Gateway proxy response with CORS headers and a JSON body."""
+    response_headers = dict(CORS_HEADERS)
+    if headers:
+        response_headers.update(headers)
+    return {
+        'statusCode': status_code,
+        'headers': response_headers,
+        'body': dumps(body)
+    }
+
+
+def error_response(error, include_details=False):
+    """Log an unexpected exception and turn it into a 500 response.
+
+    With include_details the body carries the traceback as well, which the
+    knowledge-base frontend shows while debugging.
+    """
+    logger.exception("Unhandled error: %s", error)
+    if include_details:
+        # Error path only - keep traceback out of the cold-start imports
+        import traceback
+        return json_response(500, {
+            'error': f"Error: {error}",
+            'details': traceback.format_exc()
+        })
+    return json_response(500, {'error': str(error)})
@@ -0,0 +1,16 @@
+import logging
+import os
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+# The Lambda runtime installs a handler on the root logger; add one when
+# running outside Lambda (docker, scripts) so messages are not dropped
+if not logging.getLogger().handlers:
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s %(message)s')
+
+
+def get_logger(name):
+    """Return a logger at the configured LOG_LEVEL."""
+    logger = logging.getLogger(name)
+    logger.setLevel(LOG_LEVEL)
+    return logger
@@ -0,0 +1,207 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import time
+
+# Per-request CloudWatch metrics in Embedded Metric Format (EMF).
+#
+# DynamoDB calls are measured through botocore event hooks on the shared
+# clients (see aws_clients), response serialization by http_responses, and
+# the @instrumented handler decorator writes everything collected during the
+# request as EMF JSON lines on stdout, which CloudWatch Logs turns into
+# metrics - no PutMetricData calls on the request path.
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'PKB/Handlers')
+
+# On in Lambda, off for local runs unless EMF_METRICS=true
+_setting = os.environ.get('EMF_METRICS', 'auto').lower()
+ENABLED = _setting == 'true' or (_setting == 'auto' and 'AWS_LAMBDA_FUNCTION_NAME' in os.environ)
+
+READ_OPERATIONS = {'GetItem', 'BatchGetItem', 'Query', 'Scan', 'TransactGetItems'}
+WRITE_OPERATIONS = {
+    'PutItem', 'UpdateItem', 'DeleteItem', 'BatchWriteItem', 'TransactWriteItems'
+}
+
+# EMF accepts at most 100 values per metric in one document
+MAX_VALUES = 100
+
+_request = contextvars.ContextVar('emf_request', default=None)
+
+# Extra consumers of DynamoDB call latencies (the HTTP server's Prometheus
+# histograms), called as observer(operation, latency_ms)
+_call_observers = []
+
+# Extra consumers of cache lookups, called as observer(cache_name, hit)
+_cache_observers = []
+
+
+class RequestMetrics:
+    """Values collected during one invocation, grouped by operation."""
+
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.operations = {}
+        self.totals = {}
+
+    def add(self, operation, name, value, unit):
+        metrics = self.operations.setdefault(operation, {})
+        values = metrics.setdefault(name, (unit, []))[1]
+        if len(values) < MAX_VALUES:
+            values.append(value)
+
+    def add_total(self, name, value, unit):
+        """Add to a per-request total (DynamoDB work done by the whole request)."""
+        self.totals[name] = (unit, self.totals.get(name, (unit, 0))[1] + value)
+
+    def documents(self):
+        """One EMF document per operation, dimensioned by function and operation.
+
+        The per-request totals go out under Operation=Request, without the
+        FunctionName rollup so they are not counted twice.
+        """
+        timestamp = int(time.time() * 1000)
+        for operation, metrics in self.operations.items():
+            values = {name: vals[0] if len(vals) == 1 else vals for name, (_, vals) in metrics.items()}
+            units = {name: unit for name, (unit, _) in metrics.items()}
+            yield self._document(timestamp, operation, values, units, [['FunctionName', 'Operation'], ['FunctionName']])
+        if self.totals:
+            values = {name: total for name, (_, total) in self.totals.items()}
+            units = {name: unit for name, (unit, _) in self.totals.items()}
+            yield self._document(timestamp, 'Request', values, units, [['FunctionName', 'Operation']])
+
+    def _document(self, timestamp, operation, values, units, dimensions):
+        document = {
+            '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': dimensions,
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, unit in units.items()]
+                }]
+            },
+            'FunctionName': self.function_name,
+            'Operation': operation
+        }
+        document.update(values)
+        return document
+
+
+def instrumented(handler):
+    """Collect metrics for every invocation of a handler (plain or async) and flush them."""
+    if not ENABLED:
+        return handler
+
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(event, context):
+            token = _start_request(context)
+            try:
+                return await handler(event, context)
+            finally:
+                _flush_request(token)
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        token = _start_request(context)
+        try:
+            return handler(event, context)
+        finally:
+            _flush_request(token)
+    return wrapper
+
+
+def _start_request(context):
+    function_name = getattr(context, 'function_name', None) or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+    return _request.set(RequestMetrics(function_name))
+
+
+def _flush_request(token):
+    request = _request.get()
+    _request.reset(token)
+    for document in request.documents():
+        print(json.dumps(document), flush=True)
+
+
+def record_response(serialize_ms, payload_bytes):
+    """Response body serialization time and size (called by http_responses)."""
+    request = _request.get()
+    if request is not None:
+        request.add('Response', 'SerializationTime', round(serialize_ms, 3), 'Milliseconds')
+        request.add('Response', 'PayloadBytes', payload_bytes, 'Bytes')
+
+
+def record_cache_lookup(cache_name, hit):
+    """One read-through cache lookup (called by cache); sums to hit/miss counts."""
+    for observer in _cache_observers:
+        observer(cache_name, hit)
+    request = _request.get()
+    if request is not None:
+        request.add('Cache', 'CacheHits', 1 if hit else 0, 'Count')
+        request.add('Cache', 'CacheMisses', 0 if hit else 1, 'Count')
+
+
+def observe_cache_lookups(observer):
+    """Also report every cache lookup to observer(cache_name, hit)."""
+    _cache_observers.append(observer)
+
+
+def observe_dynamodb_calls(observer):
+    """Also report every DynamoDB call to observer(operation, latency_ms).
+
+    Register before the clients are built (instrument_dynamodb runs once per
+    client); the EMF metrics stay tied to ENABLED.
+    """
+    _call_observers.append(observer)
+
+
+def instrument_dynamodb(client):
+    """Hook a DynamoDB client so every call records latency, counts and capacity."""
+    if not ENABLED and not _call_observers:
+        return
+    events = client.meta.events
+    if ENABLED:
+        events.register('before-parameter-build.dynamodb', _request_capacity)
+    events.register('before-call.dynamodb', _start_call)
+    events.register('after-call.dynamodb', _record_call)
+
+
+def _request_capacity(params, model, **kwargs):
+    if model.name in READ_OPERATIONS or model.name in WRITE_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _start_call(context, **kwargs):
+    context['emf_started'] = time.perf_counter()
+
+
+def _record_call(parsed, model, context, **kwargs):
+    started = context.get('emf_started')
+    if started is None:
+        return
+    operation = model.name
+    latency_ms = (time.perf_counter() - started) * 1000
+    for observer in _call_observers:
+        observer(operation, latency_ms)
+
+    request = _request.get()
+    if request is None:
+        return
+    request.add(operation, 'DynamoDBLatency', round(latency_ms, 3), 'Milliseconds')
+    request.add_total('DynamoDBCalls', 1, 'Count')
+    if 'ScannedCount' in parsed:
+        request.add(operation, 'ScannedCount', parsed['ScannedCount'], 'Count')
+        request.add(operation, 'ReturnedCount', parsed.get('Count', 0), 'Count')
+        request.add_total('ScannedCount', parsed['ScannedCount'], 'Count')
+        request.add_total('ReturnedCount', parsed.get('Count', 0), 'Count')
+
+    consumed = parsed.get('ConsumedCapacity')
+    if consumed is None:
+        return
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    units = sum(entry.get('CapacityUnits', 0) for entry in consumed)
+    name = 'ConsumedRCU' if operation in READ_OPERATIONS else 'ConsumedWCU'
+    request.add(operation, name, units, 'Count')
+    request.add_total(name, units, 'Count')
@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+from urllib.parse import urlparse
+
+from botocore.exceptions import ClientError
+
+import aws_clients
+import data_access
+from http_responses import DecimalEncoder
+
+# Compressed snapshots in blob storage, addressed by URL:
+#
+#   s3://bucket/key       S3 (Lambda, kubernetes)
+#   file:///path/to/file  local filesystem stand-in (tests, docker, one host)
+#
+# A snapshot is one gzip-compressed JSON document. Readers get None for a
+# snapshot that was never written; other errors propagate.
+
+
+def encode(document):
+    """gzip-compressed JSON, with DynamoDB Decimals as plain numbers."""
+    return gzip.compress(json.dumps(document, cls=DecimalEncoder, separators=(',', ':')).encode('utf-8'))
+
+
+def decode(data):
+    return json.loads(gzip.decompress(data))
+
+
+def write_snapshot(url, document):
+    """Store a document at url (blocking: the snapshot job is not a request handler)."""
+    data = encode(document)
+    location = urlparse(url)
+    if location.scheme == 's3':
+        aws_clients.get_client('s3').put_object(
+            Bucket=location.netloc,
+            Key=location.path.lstrip('/'),
+            Body=data,
+            ContentType='application/json',
+            ContentEncoding='gzip'
+        )
+    elif location.scheme == 'file':
+        # Replace atomically so readers never see half a file
+        os.makedirs(os.path.dirname(location.path), exist_ok=True)
+        partial = f"{location.path}.partial"
+        with open(partial, 'wb') as snapshot_file:
+            snapshot_file.write(data)
+        os.replace(partial, location.path)
+    else:
+        raise ValueError(f"Unsupported snapshot URL: {url}")
+    return len(data)
+
+
+async def read_snapshot(url):
+    """The document stored at url, or None if there is none yet."""
+    location = urlparse(url)
+    if location.scheme == 's3':
+        data = await _read_s3(location.netloc, location.path.lstrip('/'))
+    elif location.scheme == 'file':
+        try:
+            with open(location.path, 'rb') as snapshot_file:
+                data = snapshot_file.read()
+        except FileNotFoundError:
+            data = None
+    else:
+        raise ValueError(f"Unsupported snapshot URL: {url}")
+    return decode(data) if data is not None else None
+
+
+async def _read_s3(bucket, key):
+    try:
+        if not data_access.ASYNC:
+            return aws_clients.get_client('s3').get_object(Bucket=bucket, Key=key)['Body'].read()
+        client = await aws_clients.get_async_client('s3')
+        response = await client.get_object(Bucket=bucket, Key=key)
+        async with response['Body'] as body:
+            return await body.read()
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None
+        raise
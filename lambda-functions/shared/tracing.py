@@ -0,0 +1,187 @@
+import functools
+import inspect
+import os
+from contextlib import contextmanager
+
+from log import get_logger
+
+logger = get_logger(__name__)
+
+# Opt-in OpenTelemetry tracing.
+#
+# With OTEL_TRACING=true every invocation becomes a SERVER span (continuing
+# the W3C trace context of the incoming traceparent header), with child spans
+# for request body parsing, each AWS SDK call (botocore event hooks on the
+# shared clients, see aws_clients) and response serialization. Spans go over
+# OTLP/HTTP to OTEL_EXPORTER_OTLP_ENDPOINT (the collector in docker-compose).
+#
+# opentelemetry is imported only when tracing is on, and is not part of the
+# shared layer: install requirements-tracing.txt next to the handler to use it.
+ENABLED = os.environ.get('OTEL_TRACING', 'false').lower() == 'true'
+
+_tracer = None
+_provider = None
+
+
+def _setup():
+    global ENABLED, _provider, _tracer
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_TRACING is on but opentelemetry is not installed - tracing disabled")
+        ENABLED = False
+        return
+
+    service_name = os.environ.get('OTEL_SERVICE_NAME') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+    _provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+    # The exporter reads OTEL_EXPORTER_OTLP_ENDPOINT itself
+    _provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(_provider)
+    _tracer = trace.get_tracer('pkb.handlers')
+
+
+if ENABLED:
+    _setup()
+
+
+# Lambda freezes the environment after each invocation, so spans are flushed
+# before returning there; a long-running server exports in the background
+FLUSH_EACH_INVOCATION = 'AWS_LAMBDA_FUNCTION_NAME' in os.environ
+
+
+def traced(handler):
+    """Run every invocation of a handler (plain or async) in a span and export it."""
+    if not ENABLED:
+        return handler
+
+    if inspect.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(event, context):
+            try:
+                with _request_span(event, context) as request_span:
+                    response = await handler(event, context)
+                    _set_status(request_span, response)
+                    return response
+            finally:
+                if FLUSH_EACH_INVOCATION:
+                    _provider.force_flush()
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        try:
+            with _request_span(event, context) as request_span:
+                response = handler(event, context)
+                _set_status(request_span, response)
+                return response
+        finally:
+            if FLUSH_EACH_INVOCATION:
+                _provider.force_flush()
+    return wrapper
+
+
+def _request_span(event, context):
+    from opentelemetry import propagate
+    from opentelemetry.trace import SpanKind
+
+    function_name = getattr(context, 'function_name', None) or _provider.resource.attributes.get('service.name')
+    attributes = {'faas.name': function_name}
+    if getattr(context, 'aws_request_id', None):
+        attributes['faas.invocation_id'] = context.aws_request_id
+    if isinstance(event, dict) and event.get('httpMethod'):
+        attributes['http.request.method'] = event['httpMethod']
+        attributes['url.path'] = event.get('path') or ''
+    return _tracer.start_as_current_span(
+        function_name,
+        context=propagate.extract(trace_carrier(event)),
+        kind=SpanKind.SERVER,
+        attributes=attributes
+    )
+
+
+def _set_status(request_span, response):
+    if isinstance(response, dict) and 'statusCode' in response:
+        request_span.set_attribute('http.response.status_code', response['statusCode'])
+
+
+def trace_carrier(event):
+    """W3C trace context of an event: HTTP headers, or the trace_context of an async event."""
+    if not isinstance(event, dict):
+        return {}
+    headers = event.get('headers') or {}
+    carrier = {key.lower(): value for key, value in headers.items()}
+    if 'traceparent' not in carrier:
+        carrier.update(event.get('trace_context') or {})
+    return carrier
+
+
+def inject_context():
+    """The current W3C trace context, for events handed to another function."""
+    if not ENABLED:
+        return {}
+    from opentelemetry import propagate
+    carrier = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+@contextmanager
+def span(name, **attributes):
+    """Child span around a block of handler work (no-op with tracing off)."""
+    if not ENABLED:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def instrument_client(client):
+    """Hook a botocore client so every AWS call gets a CLIENT span."""
+    if not ENABLED:
+        return
+    events = client.meta.events
+    events.register('before-call', _start_call)
+    events.register('after-call', _end_call)
+    events.register('after-call-error', _end_call)
+
+
+def _start_call(model, context, **kwargs):
+    from opentelemetry.trace import SpanKind
+    service = model.service_model.service_id
+    context['otel_span'] = _tracer.start_span(
+        f"{service}.{model.name}",
+        kind=SpanKind.CLIENT,
+        attributes={'rpc.system': 'aws-api', 'rpc.service': str(service), 'rpc.method': model.name}
+    )
+
+
+def _end_call(context, parsed=None, exception=None, **kwargs):
+    call_span = context.pop('otel_span', None)
+    if call_span is None:
+        return
+    from opentelemetry.trace import Status, StatusCode
+    metadata = (parsed or {}).get('ResponseMetadata', {})
+    if metadata.get('RequestId'):
+        call_span.set_attribute('aws.request_id', metadata['RequestId'])
+    if metadata.get('HTTPStatusCode'):
+        call_span.set_attribute('http.response.status_code', metadata['HTTPStatusCode'])
+    if metadata.get('RetryAttempts'):
+        call_span.set_attribute('aws.retry_attempts', metadata['RetryAttempts'])
+    if 'ConsumedCapacity' in (parsed or {}):
+        consumed = parsed['ConsumedCapacity']
+        consumed = consumed if isinstance(consumed, list) else [consumed]
+        call_span.set_attribute('aws.dynamodb.consumed_capacity', sum(c.get('CapacityUnits', 0) for c in consumed))
+    if 'ScannedCount' in (parsed or {}):
+        call_span.set_attribute('aws.dynamodb.scanned_count', parsed['ScannedCount'])
+        call_span.set_attribute('aws.dynamodb.count', parsed.get('Count', 0))
+    error = (parsed or {}).get('Error')
+    if exception is not None:
+        call_span.record_exception(exception)
+        call_span.set_status(Status(StatusCode.ERROR, str(exception)))
+    elif error:
+        call_span.set_status(Status(StatusCode.ERROR, error.get('Code', '')))
+    call_span.end()
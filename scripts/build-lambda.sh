@@ -57,7 +57,7 @@ build_lambda() {
         pip install -q -r requirements.txt -t package/ --upgrade --no-cache-dir 2>/dev/null || echo "Install warning"
       fi
       
-      # Copy Lambda function
+      # Copy Lambda function (shared modules come from the layer)
       cp lambda_function.py package/
       
       # Clean up to minimize size
@@ -68,6 +68,21 @@ build_lambda() {
       find package -type d -name "setuptools" -exec rm -rf {} + 2>/dev/null || true
       find package -name "*.html" -delete 2>/dev/null || true
       find package -name "*.txt" -delete 2>/dev/null || true
+      find package -type d -name "tests" -exec rm -rf {} + 2>/dev/null || true
+      
+      # boto3 and its dependencies ship with the Lambda runtime; bundled copies
+      # only add unzip and import time at cold start
+      for runtime_pkg in boto3 botocore s3transfer jmespath dateutil urllib3; do
+          rm -rf "package/$runtime_pkg"
+      done
+      rm -f package/six.py
+    fi
+    
+    # The knowledge-base router bundles the handlers it dispatches to
+    if [ "$func_name" = "api-router" ]; then
+        for routed in get-items get-changes create-item delete-item; do
+            cp "../$routed/lambda_function.py" "package/${routed//-/_}.py"
+        done
     fi
     
     # Create zip
@@ -85,13 +100,41 @@ build_lambda() {
     cd "$ORIGINAL_DIR"
 }
 
+# Build the shared layer (responses, client factory, logging) once;
+# Lambda mounts it under /opt/python, which is on sys.path
+build_layer() {
+    START_TIME=$(date +%s)
+    echo -e "${BLUE}Building shared layer...${NC}"
+    
+    cd shared
+    rm -f layer.zip
+    rm -rf build/
+    mkdir -p build/python
+    cp *.py build/python/
+    
+    cd build
+    zip -rq ../layer.zip python
+    cd ..
+    rm -rf build/
+    
+    SIZE=$(du -h layer.zip | cut -f1)
+    END_TIME=$(date +%s)
+    ELAPSED=$((END_TIME - START_TIME))
+    echo -e "${GREEN}  ✅ shared layer packaged (${SIZE}) in ${ELAPSED}s${NC}"
+    cd ..
+}
+
 cd lambda-functions
 
+echo -e "${BLUE}🧩 Building shared Lambda layer...${NC}"
+build_layer
+echo ""
+
 # Build Knowledge Base Lambda functions
 echo -e "${BLUE}📚 Building Knowledge Base Lambda functions...${NC}"
 if [ -d "knowledge-base" ]; then
     cd knowledge-base
-    for func in get-items create-item delete-item; do
+    for func in get-items get-changes create-item delete-item api-router snapshot-items; do
         if [ -d "$func" ]; then
             build_lambda "$func"
         fi
@@ -104,7 +147,7 @@ echo ""
 echo -e "${BLUE}💰 Building Budget Tracker Lambda functions...${NC}"
 if [ -d "budget-tracker" ]; then
     cd budget-tracker
-    for func in add-transaction get-balance send-alert; do
+    for func in add-transaction get-balance send-alert import-transactions; do
         if [ -d "$func" ]; then
             build_lambda "$func"
         fi
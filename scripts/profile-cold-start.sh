@@ -0,0 +1,170 @@
+#!/bin/bash
+
+set -e
+
+# Cold-start profile for every Lambda function.
+#
+#   ./scripts/profile-cold-start.sh              # local: python -X importtime per handler
+#   ./scripts/profile-cold-start.sh --aws [N]    # deployed: INIT Duration of N forced cold starts
+#
+# Local mode needs boto3 installed; AWS mode needs the AWS CLI with access to
+# the deployed functions. Run it before and after a change and compare.
+
+# Colors for output
+GREEN='\033[0;32m'
+BLUE='\033[0;34m'
+YELLOW='\033[1;33m'
+NC='\033[0m' # No Color
+
+# function directory -> deployed function name
+FUNCTIONS=(
+  "knowledge-base/get-items:pkb-api-get-items"
+  "knowledge-base/get-changes:pkb-api-get-changes"
+  "knowledge-base/create-item:pkb-api-create-item"
+  "knowledge-base/delete-item:pkb-api-delete-item"
+  "knowledge-base/api-router:pkb-api-router"
+  "budget-tracker/add-transaction:budget-tracker-add-transaction"
+  "budget-tracker/get-balance:budget-tracker-get-balance"
+  "budget-tracker/send-alert:budget-tracker-send-alert"
+  "budget-tracker/import-transactions:budget-tracker-import-transactions"
+)
+
+# Payloads that return early (validation errors, no writes) so probing a
+# function never changes data
+probe_payload() {
+    case "$1" in
+      pkb-api-create-item) echo '{"body": "{}"}' ;;
+      budget-tracker-add-transaction) echo '{"headers": {"X-Account-Id": "!"}}' ;;
+      budget-tracker-send-alert) echo '{"body": "{\"alerts\": []}"}' ;;
+      # An S3 notification without records: imports nothing, returns 200
+      budget-tracker-import-transactions) echo '{"Records": []}' ;;
+      *) echo '{}' ;;
+    esac
+}
+
+profile_local() {
+    local func_dir=$1
+    local log
+    log=$(mktemp)
+
+    echo -e "${BLUE}$func_dir${NC}"
+
+    # First run compiles the .pyc files; the second one is what gets measured
+    for run in 1 2; do
+        (
+            cd "lambda-functions/$func_dir"
+            PYTHONPATH="../../shared" TABLE_NAME=profile SNS_TOPIC_ARN=profile \
+            AWS_DEFAULT_REGION="${AWS_REGION:-us-east-1}" \
+            python3 -X importtime -c "import lambda_function" 2> "$log"
+        )
+    done
+
+    python3 - "$log" <<'EOF'
+import sys
+
+top_level = []
+for line in open(sys.argv[1]):
+    if not line.startswith('import time:') or 'cumulative' in line:
+        continue
+    self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+    # Nested imports are indented below the module that triggered them
+    if not name[1:].startswith(' '):
+        top_level.append((int(cumulative_us), name.strip()))
+
+total = sum(us for us, _ in top_level)
+print(f"  total import time: {total / 1000:.1f} ms")
+for us, name in sorted(top_level, reverse=True)[:8]:
+    print(f"    {us / 1000:8.1f} ms  {name}")
+EOF
+    rm -f "$log"
+}
+
+restore_environment() {
+    if [ -n "$RESTORE_FUNCTION" ]; then
+        aws lambda update-function-configuration --function-name "$RESTORE_FUNCTION" \
+            --environment "$ORIGINAL_ENVIRONMENT" > /dev/null
+        aws lambda wait function-updated --function-name "$RESTORE_FUNCTION"
+        echo "  environment of $RESTORE_FUNCTION restored"
+        RESTORE_FUNCTION=""
+    fi
+}
+
+profile_aws() {
+    local func_name=$1
+    local runs=$2
+    local inits=()
+
+    echo -e "${BLUE}$func_name${NC}"
+
+    # Optional functions (pkb-api-router) may not be deployed
+    if ! aws lambda get-function --function-name "$func_name" > /dev/null 2>&1; then
+        echo -e "  ${YELLOW}not deployed - skipped${NC}"
+        return
+    fi
+
+    # The probe variable below changes the configuration; put the deployed
+    # environment back afterwards (also on failure) so Terraform sees no drift
+    ORIGINAL_ENVIRONMENT=$(aws lambda get-function-configuration --function-name "$func_name" \
+        --query 'Environment' --output json | python3 -c "
+import json, sys
+environment = json.load(sys.stdin) or {}
+variables = environment.get('Variables', {})
+variables.pop('COLD_START_PROBE', None)  # left behind by older versions of this script
+print(json.dumps({'Variables': variables}))")
+    RESTORE_FUNCTION=$func_name
+    trap restore_environment EXIT
+
+    for run in $(seq "$runs"); do
+        # Changing the configuration retires the warm environments, so the
+        # next invoke is a cold start
+        ENVIRONMENT=$(echo "$ORIGINAL_ENVIRONMENT" | python3 -c "
+import json, sys, time
+environment = json.load(sys.stdin)
+environment['Variables']['COLD_START_PROBE'] = str(time.time_ns())
+print(json.dumps(environment))")
+        aws lambda update-function-configuration --function-name "$func_name" \
+            --environment "$ENVIRONMENT" > /dev/null
+        aws lambda wait function-updated --function-name "$func_name"
+
+        INIT=$(aws lambda invoke --function-name "$func_name" --log-type Tail \
+            --cli-binary-format raw-in-base64-out --payload "$(probe_payload "$func_name")" \
+            --query 'LogResult' --output text /dev/null | base64 --decode \
+            | grep -o 'Init Duration: [0-9.]*' | grep -o '[0-9.]*$' || true)
+        if [ -n "$INIT" ]; then
+            inits+=("$INIT")
+            echo "  run $run: INIT ${INIT} ms"
+        else
+            echo -e "  ${YELLOW}run $run: no Init Duration in REPORT (warm start?)${NC}"
+        fi
+    done
+
+    restore_environment
+    trap - EXIT
+
+    if [ ${#inits[@]} -gt 0 ]; then
+        printf '%s\n' "${inits[@]}" | python3 -c "
+import statistics, sys
+values = sorted(float(line) for line in sys.stdin)
+print(f'  INIT min {values[0]:.1f} ms  median {statistics.median(values):.1f} ms  max {values[-1]:.1f} ms')"
+    fi
+}
+
+cd "$(dirname "$0")/.."
+
+if [ "$1" = "--aws" ]; then
+    RUNS=${2:-5}
+    echo "⏱️  Measuring INIT Duration over $RUNS cold starts per function..."
+    echo ""
+    for entry in "${FUNCTIONS[@]}"; do
+        profile_aws "${entry#*:}" "$RUNS"
+    done
+else
+    echo "⏱️  Profiling module import time (python -X importtime)..."
+    echo ""
+    for entry in "${FUNCTIONS[@]}"; do
+        profile_local "${entry%%:*}"
+    done
+fi
+
+echo ""
+echo -e "${GREEN}✅ Cold-start profile complete${NC}"
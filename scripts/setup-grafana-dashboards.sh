@@ -14,6 +14,8 @@ mkdir -p /tmp/grafana-dashboards
 echo "📋 Copying dashboard files..."
 cp grafana/dashboards/serverless-monitoring.json /tmp/grafana-dashboards/
 cp grafana/dashboards/advanced-serverless-v2.json /tmp/grafana-dashboards/advanced-serverless-v2.json 2>/dev/null || echo "⚠️ advanced-serverless-v2.json not found, skipping"
+cp grafana/dashboards/read-efficiency.json /tmp/grafana-dashboards/
+cp grafana/dashboards/lambda-monitoring.json /tmp/grafana-dashboards/
 
 # Create ConfigMap from directory
 echo "🔧 Creating ConfigMap..."
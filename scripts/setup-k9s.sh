@@ -36,13 +36,11 @@ minikube status || minikube start
 echo -e "${BLUE}✓ Setting up Docker environment...${NC}"
 eval $(minikube docker-env)
 
-echo -e "${BLUE}✓ Building Lambda Docker images...${NC}"
+echo -e "${BLUE}✓ Building the API server image...${NC}"
 cd ../docker
 
-# Build images
-docker build -f Dockerfile.lambda -t pkb-get-items:latest ../lambda-functions/get-items/
-docker build -f Dockerfile.lambda -t pkb-create-item:latest ../lambda-functions/create-item/
-docker build -f Dockerfile.lambda -t pkb-delete-item:latest ../lambda-functions/delete-item/
+# One image for every deployment (HTTP server mode, see lambda-functions/server)
+docker build -f Dockerfile.server -t pkb-server:latest ../lambda-functions/
 
 echo -e "${GREEN}✓ Images built successfully!${NC}"
 
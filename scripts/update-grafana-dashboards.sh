@@ -26,6 +26,26 @@ kubectl create configmap grafana-dashboards-advanced \
   --dry-run=client -o yaml \
   --namespace=grafana | kubectl apply -f -
 
+# Read Efficiency & Capacity Dashboard (EMF handler metrics)
+kubectl create configmap grafana-dashboards-read-efficiency \
+  --from-file=grafana/dashboards/read-efficiency.json \
+  --dry-run=client -o yaml \
+  --namespace=grafana | kubectl apply -f -
+
+# Lambda Monitoring Dashboard (Prometheus, HTTP server mode pods)
+kubectl create configmap grafana-dashboards-lambda \
+  --from-file=grafana/dashboards/lambda-monitoring.json \
+  --dry-run=client -o yaml \
+  --namespace=grafana | kubectl apply -f -
+
+# Prometheus scraping the HTTP server mode pods (GET /metrics)
+echo "📈 Deploying Prometheus..."
+kubectl apply -f kubernetes/prometheus-rbac.yaml
+kubectl apply -f kubernetes/prometheus-config.yaml
+kubectl apply -f kubernetes/prometheus-deployment.yaml
+kubectl apply -f kubernetes/prometheus-service.yaml
+kubectl apply -f kubernetes/prometheus-adapter.yaml
+
 # Apply Grafana deployment (updated with volume mounts)
 echo "🚀 Deploying updated Grafana configuration..."
 kubectl apply -f kubernetes/grafana-deployment.yaml -n grafana
@@ -44,6 +64,8 @@ echo ""
 echo "🌐 Available dashboards:"
 echo "   - 🚀 Serverless Monitoring (Basic)"
 echo "   - 🎯 Advanced Serverless v2 (Advanced - 10 panels)"
+echo "   - 💸 Read Efficiency & Capacity (DynamoDB cost per handler + alert rules)"
+echo "   - 📈 Lambda Monitoring (Prometheus metrics of the server mode pods)"
 echo ""
 echo "💡 Tip: Dashboards should auto-load in Grafana UI"
 
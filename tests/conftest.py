@@ -0,0 +1,106 @@
+"""
+Shared fixtures: handler loading and a moto stand-in for DynamoDB.
+
+Handlers are plain lambda_function.py modules that import the shared layer
+by name, so the layer directory goes on sys.path and every handler is
+loaded from its file under a unique module name.
+"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS_DIR = os.path.join(ROOT, 'lambda-functions')
+
+KB_TABLE = 'PersonalKnowledgeBase'
+BUDGET_TABLE = 'BudgetTracker'
+
+# Handlers read their configuration at import time; no call leaves moto
+os.environ.update({
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'LOG_LEVEL': 'WARNING',
+    'SNS_TOPIC_ARN': 'arn:aws:sns:us-east-1:123456789012:tests',
+})
+sys.path.insert(0, os.path.join(FUNCTIONS_DIR, 'shared'))
+
+try:
+    # moto hooks botocore when imported: load it before any handler builds
+    # its module-level clients, so those clients are mocked too
+    import moto  # noqa: F401
+except ImportError:
+    pass
+
+
+def load_function(function_dir, table_name):
+    """Import one lambda_function.py (e.g. 'budget-tracker/add-transaction')."""
+    os.environ['TABLE_NAME'] = table_name
+    path = os.path.join(FUNCTIONS_DIR, function_dir, 'lambda_function.py')
+    name = 'test_' + function_dir.replace('/', '_').replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def budget_table():
+    """A moto BudgetTracker table with the AccountIndex GSI, empty per test."""
+    boto3 = pytest.importorskip('boto3')
+    moto = pytest.importorskip('moto')
+    import balances
+
+    balances.shard_counts.clear()
+    with moto.mock_aws():
+        dynamodb = boto3.resource('dynamodb')
+        table = dynamodb.create_table(
+            TableName=BUDGET_TABLE,
+            KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[
+                {'AttributeName': 'id', 'AttributeType': 'S'},
+                {'AttributeName': 'account_id', 'AttributeType': 'S'},
+                {'AttributeName': 'timestamp', 'AttributeType': 'S'},
+            ],
+            GlobalSecondaryIndexes=[{
+                'IndexName': 'AccountIndex',
+                'KeySchema': [
+                    {'AttributeName': 'account_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'timestamp', 'KeyType': 'RANGE'},
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+            }],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield table
+
+
+@pytest.fixture
+def kb_table():
+    """A moto PersonalKnowledgeBase table with the UpdatedAtIndex GSI, empty per test."""
+    boto3 = pytest.importorskip('boto3')
+    moto = pytest.importorskip('moto')
+
+    with moto.mock_aws():
+        dynamodb = boto3.resource('dynamodb')
+        table = dynamodb.create_table(
+            TableName=KB_TABLE,
+            KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[
+                {'AttributeName': 'id', 'AttributeType': 'S'},
+                {'AttributeName': 'listing', 'AttributeType': 'S'},
+                {'AttributeName': 'updated_at', 'AttributeType': 'S'},
+            ],
+            GlobalSecondaryIndexes=[{
+                'IndexName': 'UpdatedAtIndex',
+                'KeySchema': [
+                    {'AttributeName': 'listing', 'KeyType': 'HASH'},
+                    {'AttributeName': 'updated_at', 'KeyType': 'RANGE'},
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+            }],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield table
@@ -0,0 +1,106 @@
+import json
+
+from tests.conftest import BUDGET_TABLE, load_function
+
+add_transaction = load_function('budget-tracker/add-transaction', BUDGET_TABLE)
+
+
+def post(body, account_id='household-1'):
+    event = {'headers': {'X-Account-Id': account_id}, 'body': json.dumps(body)}
+    response = add_transaction.handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_repeated_transaction_id_is_rejected_and_not_counted_twice(budget_table):
+    status, body = post({'id': 'txn-1', 'amount': 25, 'type': 'income'})
+    assert status == 200
+    assert body['balance_minor'] == 2500
+
+    # A retried POST, and a reused id with another amount
+    assert post({'id': 'txn-1', 'amount': 25, 'type': 'income'})[0] == 409
+    status, body = post({'id': 'txn-1', 'amount': 99, 'type': 'income'})
+    assert status == 409
+    assert body['transaction_id'] == 'txn-1'
+
+    assert budget_table.get_item(Key={'id': 'txn-1'})['Item']['amount_minor'] == 2500
+    balance = budget_table.get_item(Key={'id': 'balance#household-1'})['Item']
+    assert balance['balance_minor'] == 2500
+    assert balance['txn_count'] == 1
+
+
+def test_balance_sums_every_shard(budget_table):
+    import balances
+
+    balances.shard_counts['household-1'] = 4
+    budget_table.put_item(Item={'id': 'balance#household-1', 'balance_minor': 1000, 'txn_count': 1, 'shard_count': 4})
+    for shard in range(1, 4):
+        budget_table.put_item(Item={'id': f"balance#household-1#{shard}", 'balance_minor': 100, 'txn_count': 1})
+
+    status, body = post({'id': 'txn-2', 'amount': 1, 'type': 'expense'})
+
+    assert status == 200
+    assert body['balance_minor'] == 1000 + 300 - 100
+
+
+def test_crossing_alert_fires_only_when_the_threshold_is_crossed(monkeypatch):
+    monkeypatch.setattr(add_transaction, 'LOW_BALANCE_THRESHOLD_MINOR', 0)
+
+    assert add_transaction.crossing_alert(500, -100) == 'low-balance'
+    assert add_transaction.crossing_alert(0, -1) == 'low-balance'
+    assert add_transaction.crossing_alert(-100, 200) == 'low-balance-recovered'
+    assert add_transaction.crossing_alert(-1, 0) == 'low-balance-recovered'
+    # Staying on one side of the threshold sends nothing
+    assert add_transaction.crossing_alert(500, 100) is None
+    assert add_transaction.crossing_alert(-100, -500) is None
+
+
+def test_expense_that_crosses_the_threshold_emits_one_alert_event(budget_table, monkeypatch):
+    events = []
+
+    async def capture(alert):
+        events.append(alert)
+
+    monkeypatch.setattr(add_transaction, 'emit_alert_event', capture)
+    monkeypatch.setattr(add_transaction, 'LOW_BALANCE_THRESHOLD_MINOR', 0)
+
+    post({'id': 'txn-1', 'amount': 10, 'type': 'income'})
+    post({'id': 'txn-2', 'amount': 15, 'type': 'expense'})
+    post({'id': 'txn-3', 'amount': 5, 'type': 'expense'})
+
+    assert [event['alert'] for event in events] == ['low-balance']
+    assert events[0]['account_id'] == 'household-1'
+    assert events[0]['balance'] == -5.0
+    assert events[0]['transaction_id'] == 'txn-2'
+
+
+def test_category_limit_crossed_only_by_the_expense_that_goes_over():
+    spend = {'spent_minor': 41000, 'limit_minor': 40000}
+
+    assert add_transaction.category_limit_crossed(spend, 2000)
+    assert add_transaction.category_limit_crossed({'spent_minor': 40001, 'limit_minor': 40000}, 1)
+    # Reaching the limit exactly is not over it
+    assert not add_transaction.category_limit_crossed({'spent_minor': 40000, 'limit_minor': 40000}, 500)
+    # Already over before this expense
+    assert not add_transaction.category_limit_crossed(spend, 500)
+    # No limit configured for the category
+    assert not add_transaction.category_limit_crossed({'spent_minor': 99999}, 500)
+
+
+def test_category_budget_alert_is_emitted_once_per_month(budget_table, monkeypatch):
+    events = []
+
+    async def capture(alert):
+        events.append(alert)
+
+    monkeypatch.setattr(add_transaction, 'emit_alert_event', capture)
+    monkeypatch.setattr(add_transaction, 'LOW_BALANCE_THRESHOLD_MINOR', -10 ** 9)
+    monkeypatch.setattr(add_transaction, 'CATEGORY_BUDGETS', {'dining': 5000})
+
+    for i, amount in enumerate([30, 15, 10, 20]):
+        post({'id': f"dining-{i}", 'amount': amount, 'category': 'dining', 'type': 'expense'})
+
+    assert [event['alert'] for event in events] == ['category-budget']
+    assert events[0]['category'] == 'dining'
+    assert events[0]['spent'] == 55.0
+    assert events[0]['limit'] == 50.0
+    assert events[0]['transaction_id'] == 'dining-2'
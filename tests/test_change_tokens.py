@@ -0,0 +1,95 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.conftest import KB_TABLE, load_function
+
+import change_tokens
+
+get_changes = load_function('knowledge-base/get-changes', KB_TABLE)
+
+
+def changes_since(token):
+    response = get_changes.handler({'queryStringParameters': {'since': token}}, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_token_round_trip():
+    mark = '2024-05-01T12:00:00'
+    resume_key = {'id': 'item-7', 'listing': 'items', 'updated_at': '2024-05-01T12:00:03'}
+
+    assert change_tokens.read_token(change_tokens.issue_token(mark)) == (mark, None)
+    assert change_tokens.read_token(change_tokens.issue_token(mark, resume_key)) == (mark, resume_key)
+
+
+def test_tokens_are_url_safe_without_padding():
+    token = change_tokens.issue_token('2024-05-01T12:00:00.123456', {'id': '?/+'})
+
+    assert '=' not in token
+    assert set(token) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_')
+
+
+@pytest.mark.parametrize('token', ['', 'not a token', 'e30', change_tokens.issue_token('yesterday')])
+def test_invalid_tokens_raise_value_error(token):
+    with pytest.raises(ValueError):
+        change_tokens.read_token(token)
+
+
+def test_mark_before_trails_by_the_overlap():
+    moment = datetime(2024, 5, 1, 12, 0, 0)
+
+    assert change_tokens.mark_before(moment) == (moment - timedelta(seconds=change_tokens.OVERLAP_SECONDS)).isoformat()
+
+
+def test_missing_or_invalid_since_is_a_bad_request():
+    assert get_changes.handler({'queryStringParameters': None}, None)['statusCode'] == 400
+    assert changes_since('garbage')[0] == 400
+
+
+def test_token_older_than_the_tombstone_ttl_is_gone():
+    expired = datetime.utcnow() - timedelta(days=get_changes.TOMBSTONE_TTL_DAYS, minutes=1)
+
+    status, body = changes_since(change_tokens.issue_token(expired.isoformat()))
+
+    assert status == 410
+    assert body['reset'] is True
+
+
+def test_changes_are_paged_and_the_next_sync_starts_after_them(kb_table, monkeypatch):
+    monkeypatch.setattr(get_changes, 'PAGE_SIZE', 2)
+    since = datetime.utcnow() - timedelta(hours=1)
+    for i in range(3):
+        kb_table.put_item(Item={
+            'id': f"item-{i}",
+            'title': f"Note {i}",
+            'listing': 'items',
+            'updated_at': (since + timedelta(minutes=i + 1)).isoformat()
+        })
+    kb_table.put_item(Item={
+        'id': 'item-old',
+        'listing': 'items',
+        'updated_at': (since - timedelta(minutes=1)).isoformat()
+    })
+    kb_table.put_item(Item={
+        'id': 'item-gone',
+        'deleted': True,
+        'listing': 'items',
+        'updated_at': (since + timedelta(minutes=10)).isoformat(),
+        'expires_at': 0
+    })
+
+    seen = []
+    token = change_tokens.issue_token(since.isoformat())
+    while True:
+        status, body = changes_since(token)
+        assert status == 200
+        seen.extend(body['changes'])
+        token = body['next_token']
+        if not body['has_more']:
+            break
+
+    assert [change['id'] for change in seen] == ['item-0', 'item-1', 'item-2', 'item-gone']
+    assert seen[-1] == {'id': 'item-gone', 'deleted': True, 'updated_at': seen[-1]['updated_at']}
+    # Nothing was written since: the next sync returns no changes
+    assert changes_since(token)[1]['changes'] == []
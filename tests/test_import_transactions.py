@@ -0,0 +1,155 @@
+import io
+
+import pytest
+
+from tests.conftest import BUDGET_TABLE, load_function
+
+importer = load_function('budget-tracker/import-transactions', BUDGET_TABLE)
+
+CSV_STATEMENT = """Posting Date,Payee,Amount,Category
+2024-01-02,Grocery Store,-42.50,groceries
+2024-01-03,Employer,"2,500.00",salary
+
+01/04/2024,Coffee,-3.20,
+01/04/2024,Coffee,-3.20,
+"""
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<CURDEF>EUR
+<BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240105120000.000[-5:EST]
+<TRNAMT>-19.99
+<FITID>2024010501
+<NAME>Streaming
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240106
+<TRNAMT>100.00
+<FITID>2024010601
+<MEMO>Refund
+</STMTTRN>
+</BANKTRANLIST>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+
+def parse(statement, fmt='csv', account_id='household-1'):
+    lines = io.StringIO(statement)
+    if fmt == 'ofx':
+        return list(importer.parse_ofx(lines, account_id))
+    return list(importer.parse_csv(lines, account_id))
+
+
+def balance_item(table, account_id):
+    return table.get_item(Key={'id': f"balance#{account_id}"}).get('Item', {})
+
+
+def test_parse_csv_maps_header_aliases_and_amounts():
+    rows = parse(CSV_STATEMENT)
+
+    assert len(rows) == 4  # the blank line is skipped
+    groceries, salary, coffee, _ = rows
+    assert groceries['description'] == 'Grocery Store'
+    assert groceries['amount_minor'] == 4250
+    assert groceries['type'] == 'expense'
+    assert groceries['category'] == 'groceries'
+    assert groceries['timestamp'] == '2024-01-02T00:00:00'
+    assert groceries['currency'] == importer.DEFAULT_CURRENCY
+    assert groceries['account_id'] == 'household-1'
+    assert salary['amount_minor'] == 250000
+    assert salary['type'] == 'income'
+    assert coffee['category'] == 'other'
+    assert coffee['timestamp'] == '2024-01-04T00:00:00'
+
+
+def test_parse_csv_ids_are_deterministic_and_distinguish_repeated_rows():
+    first = [row['id'] for row in parse(CSV_STATEMENT)]
+    second = [row['id'] for row in parse(CSV_STATEMENT)]
+
+    assert first == second
+    # The two identical coffee rows are two transactions
+    assert len(set(first)) == len(first)
+    # The same statement on another account gets other ids
+    assert set(first).isdisjoint(row['id'] for row in parse(CSV_STATEMENT, account_id='other'))
+
+
+def test_parse_csv_requires_date_and_amount_columns():
+    with pytest.raises(ValueError, match='date and amount'):
+        parse("Payee,Category\nShop,other\n")
+
+
+def test_parse_csv_rejects_invalid_amounts_and_dates():
+    with pytest.raises(ValueError, match='Invalid amount'):
+        parse("date,amount\n2024-01-01,abc\n")
+    with pytest.raises(ValueError, match='Unrecognized date'):
+        parse("date,amount\nyesterday,1.00\n")
+
+
+def test_parse_ofx_reads_transactions_currency_and_fitid():
+    streaming, refund = parse(OFX_STATEMENT, fmt='ofx')
+
+    assert streaming['amount_minor'] == 1999
+    assert streaming['type'] == 'expense'
+    assert streaming['currency'] == 'EUR'
+    assert streaming['description'] == 'Streaming'
+    assert streaming['timestamp'] == '2024-01-05T00:00:00'
+    assert refund['type'] == 'income'
+    assert refund['description'] == 'Refund'
+    # Ids follow the FITID, not the row contents
+    assert streaming['id'] != refund['id']
+    assert parse(OFX_STATEMENT.replace('Streaming', 'Renamed'), fmt='ofx')[0]['id'] == streaming['id']
+
+
+def test_detect_format_and_account_for_key():
+    assert importer.detect_format('household-1/january.OFX') == 'ofx'
+    assert importer.detect_format('statement.qfx') == 'ofx'
+    assert importer.detect_format('statement.csv') == 'csv'
+    assert importer.account_for_key('household-1/january.csv') == 'household-1'
+    assert importer.account_for_key('january.csv') == importer.DEFAULT_ACCOUNT_ID
+
+
+def test_reimport_skips_duplicates_and_counts_the_balance_once(budget_table):
+    first = importer.import_statement(io.StringIO(CSV_STATEMENT), 'csv', 'household-1')
+    second = importer.import_statement(io.StringIO(CSV_STATEMENT), 'csv', 'household-1')
+
+    assert first == {'imported': 4, 'duplicates': 0, 'batches': 1, 'balance_delta_minor': 245110}
+    assert second == {'imported': 0, 'duplicates': 4, 'batches': 0, 'balance_delta_minor': 0}
+    balance = balance_item(budget_table, 'household-1')
+    assert balance['balance_minor'] == 245110
+    assert balance['txn_count'] == 4
+
+
+def test_rows_written_concurrently_are_not_counted_twice(budget_table, monkeypatch):
+    importer.import_statement(io.StringIO(CSV_STATEMENT), 'csv', 'household-1')
+
+    # Another import of the same file stored the rows after this one's pre-read
+    monkeypatch.setattr(importer, 'existing_ids', lambda ids: set())
+    extra = CSV_STATEMENT + "2024-01-05,Bakery,-5.00,groceries\n"
+    result = importer.import_statement(io.StringIO(extra), 'csv', 'household-1')
+
+    assert result['imported'] == 1
+    assert result['duplicates'] == 4
+    assert balance_item(budget_table, 'household-1')['balance_minor'] == 245110 - 500
+
+
+def test_s3_notification_keys_are_url_decoded(budget_table):
+    import boto3
+
+    s3 = boto3.client('s3')
+    s3.create_bucket(Bucket='statements')
+    s3.put_object(Bucket='statements', Key='household-1/jan 2024.csv', Body=CSV_STATEMENT.encode('utf-8'))
+    event = {'Records': [{'s3': {
+        'bucket': {'name': 'statements'},
+        'object': {'key': 'household-1/jan+2024.csv'}
+    }}]}
+
+    response = importer.handler(event, None)
+
+    assert response['statusCode'] == 200
+    assert balance_item(budget_table, 'household-1')['txn_count'] == 4
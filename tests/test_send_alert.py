@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from tests.conftest import BUDGET_TABLE, load_function
+
+send_alert = load_function('budget-tracker/send-alert', BUDGET_TABLE)
+
+ALERT_ID = 'alert#household-1#low-balance#0'
+
+
+def low_balance_event(alert='low-balance'):
+    return {'alert': alert, 'account_id': 'household-1', 'threshold': '0', 'balance': -12.5}
+
+
+@pytest.fixture
+def sns_topic(budget_table):
+    import boto3
+
+    boto3.client('sns').create_topic(Name='tests')
+
+
+def test_claim_is_taken_once_until_reset(budget_table):
+    assert send_alert.claim_alert(ALERT_ID) == {}
+    # Duplicate delivery while the alert is firing
+    assert send_alert.claim_alert(ALERT_ID) is None
+
+    # Re-armed, but still inside the cooldown window
+    send_alert.reset_alert(ALERT_ID)
+    assert send_alert.claim_alert(ALERT_ID) is None
+
+
+def test_claim_after_cooldown_returns_the_previous_state(budget_table):
+    sent_at = int(time.time()) - send_alert.ALERT_COOLDOWN_SECONDS - 1
+    budget_table.put_item(Item={'id': ALERT_ID, 'alert_state': 'ok', 'last_sent_at': sent_at})
+
+    previous = send_alert.claim_alert(ALERT_ID)
+
+    assert previous == {'alert_state': 'ok', 'last_sent_at': sent_at}
+    assert budget_table.get_item(Key={'id': ALERT_ID})['Item']['alert_state'] == 'firing'
+
+
+def test_release_restores_the_claimed_state(budget_table):
+    sent_at = int(time.time()) - send_alert.ALERT_COOLDOWN_SECONDS - 1
+    budget_table.put_item(Item={'id': ALERT_ID, 'alert_state': 'ok', 'last_sent_at': sent_at})
+    send_alert.release_alert(ALERT_ID, send_alert.claim_alert(ALERT_ID))
+
+    assert budget_table.get_item(Key={'id': ALERT_ID})['Item'] == {
+        'id': ALERT_ID, 'alert_state': 'ok', 'last_sent_at': sent_at
+    }
+
+    # A first-ever claim leaves nothing behind
+    other = 'alert#household-2#low-balance#0'
+    send_alert.release_alert(other, send_alert.claim_alert(other))
+    assert 'Item' not in budget_table.get_item(Key={'id': other})
+
+
+def test_duplicate_alert_events_publish_once(sns_topic):
+    first = send_alert.handler(low_balance_event(), None)
+    second = send_alert.handler(low_balance_event(), None)
+
+    assert first['statusCode'] == 200
+    assert 'message_id' in first['body']
+    assert 'already sent' in second['body']
+
+
+def test_failed_publish_gives_the_claim_back(budget_table, monkeypatch):
+    class FailingSNS:
+        def publish(self, **kwargs):
+            raise RuntimeError('SNS unavailable')
+
+    monkeypatch.setattr(send_alert, 'get_client', lambda service: FailingSNS())
+
+    # Asynchronous events re-raise so Lambda retries the delivery
+    with pytest.raises(RuntimeError):
+        send_alert.handler(low_balance_event(), None)
+    assert 'Item' not in budget_table.get_item(Key={'id': ALERT_ID})